@@ -1,14 +1,26 @@
-import copy
+import heapq
+from array import array
 try:
-    from .structure import Structure as St  # 相対インポート
+    from .structure import NodeStore, NodeList  # 相対インポート
+    from .cell_index import CellIndex, cell_table
+    from .grid_map import compile_maze, render_maze, PASSABLE
+    from .heuristics import get_heuristic, heuristic_field
+    from .search_events import GENERATE, EXPAND, FINISH
+    from .search_result import SearchResult
 except ImportError:
-    from structure import Structure as St  # 絶対インポート
+    from structure import NodeStore, NodeList  # 絶対インポート
+    from cell_index import CellIndex, cell_table
+    from grid_map import compile_maze, render_maze, PASSABLE
+    from heuristics import get_heuristic, heuristic_field
+    from search_events import GENERATE, EXPAND, FINISH
+    from search_result import SearchResult
 import math
 
 class Searcher:
     def __init__(self, maze_list, passed_cost=0.5,
              start_symbol="@", goal_symbol="*",
-             load_symbol=".", wall_symbol="#", route_symbol="■"):
+             load_symbol=".", wall_symbol="#", route_symbol="■",
+             heuristic="euclidean", precompute_heuristic=False, record=True):
 
         # 引数で渡された設定値
         self.maze_list = maze_list
@@ -18,50 +30,96 @@ class Searcher:
         self.load_symbol = load_symbol
         self.wall_symbol = wall_symbol
         self.route_symbol = route_symbol
+        self.heuristic = get_heuristic(heuristic)  # euclidean, manhattan, octile, chebyshev
+        self.record = record  # False なら表示用の記録（list_1_record, list_2）を作らない
 
-        # 構造と位置関係
-        self.copy_list = copy.deepcopy(maze_list)
-        self.maze_size = [len(maze_list), len(maze_list[0])]
+        # 構造と位置関係（copy_list はデバッグ表示用．search(debug=True) のときだけ地図から作る）
+        self.copy_list = None
         self.idx_list = [[-1, 0], [0, 1], [1, 0], [0, -1]]
         self.idx_len = len(self.idx_list)
 
+        # 1 セル 1 バイトに変換した地図と，探索順に並べた隣接セルのオフセット表
+        self.grid = compile_maze(maze_list, start_symbol, goal_symbol, load_symbol)
+        self.maze_size = [self.grid.rows, self.grid.cols]
+        self.offsets = self.grid.neighbor_offsets(self.idx_list)
+
         # 状態管理用
-        self.list_1 = []
-        self.list_2 = []
+        self.list_1 = []  # オープンリスト（(f, ノード番号, g) の二分ヒープ）
+        self.list_2 = array("i")
         self.goal_flag = False
         self.results_path = []
+        self.expanded_count = 0
+
+        # セル番号ごとの L1/L2 所属表とノード表，ノード情報
+        self.index = CellIndex(len(self.grid))
+        self.node_table = cell_table(len(self.grid))  # CellIndex が NEW でないセルだけを引く
+        self.store = NodeStore(self.grid)
 
         self.list_1_record = []  # 各展開ごとのL1リスト記録
 
         # スタート／ゴール地点
-        self.start_position = self._find_symbol(self.start_symbol)
-        self.goal_position = self._find_symbol(self.goal_symbol)
+        self.start_position = self.grid.get_start_position()
+        self.goal_position = self.grid.get_goal_position()
 
-
-    def _find_symbol(self, symbol):
-        return next(([i, j] for i, row in enumerate(self.maze_list) 
-                     for j, item in enumerate(row) if item == symbol), None)
+        # 推定距離の表（セル番号で引く）．ゴール位置と地図の形ごとにキャッシュされる
+        self.h_field = None
+        if precompute_heuristic and self.goal_position:
+            self.h_field = heuristic_field(heuristic, tuple(self.goal_position), *self.maze_size)
 
     def euclideanDistance(self, x1, y1, x2, y2):
         return ((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5
 
     def h(self, x1, y1, x2, y2):
-        return self.euclideanDistance(x1, y1, x2, y2)
+        return self.heuristic(abs(x1 - x2), abs(y1 - y2))
+
+    def _push(self, node):
+        # 同じ f 値ではノード番号（最初に登録した順）の小さいものから取り出す．
+        # コストを下げて入れ直したノードも元の番号で並ぶので，旧実装の安定ソートとは順序が変わることがある
+        g = self.store.g[node]
+        heapq.heappush(self.list_1, (g + self.store.h[node], node, g))
+
+    def _discard_stale(self):
+        # コスト更新で古くなったエントリを先頭から取り除く（遅延削除）
+        while self.list_1 and self.list_1[0][2] != self.store.g[self.list_1[0][1]]:
+            heapq.heappop(self.list_1)
+
+    def _open_nodes(self):
+        return [node for _, node, g in sorted(self.list_1) if g == self.store.g[node]]
 
     def search(self, debug=False):
+        for _ in self._search(debug, events=False):
+            pass
+
+    def search_iter(self, debug=False):
+        # 探索の途中経過を (種類, 値) のイベントとして順に返す
+        return self._search(debug, events=True)
+
+    def _search(self, debug, events):
+        # events が False ならイベントを作らない（search() はこれを最後まで回すだけ）
         if not self.start_position or not self.goal_position:
             raise ValueError("スタート地点またはゴール地点が見つかりません")
-
-        start_node = St()
-        start_node.setTarget(self.start_position)
-        self.list_1.append(start_node)
-        self.list_1_record.append([start_node.getTarget()])
-        goal_node = St()
+        if debug:
+            self.copy_list = render_maze(self.grid, self.start_symbol, self.goal_symbol,
+                                         self.load_symbol, self.wall_symbol)
+
+        goal_cell = self.grid.goal_cell
+        start_key = self.grid.start_cell
+        start_node = self.store.add(start_key)
+        self.index.set_open(start_key)
+        self.node_table[start_key] = start_node
+        self._push(start_node)
+        if self.record:
+            self.list_1_record.append([self.start_position])
+        if events:
+            yield (GENERATE, self.start_position)
+        goal_node = -1
+        track = self.record or events  # 座標を作る必要があるか
 
         if debug:
             num = 0
 
         while True:
+            self._discard_stale()
             if len(self.list_1) == 0:
                 if debug:
                     print("探索失敗")
@@ -72,12 +130,18 @@ class Searcher:
                 print(f"{num} 回目の探索")
 
             if debug:
-                print(f"探索リスト: {[i.getTarget() for i in self.list_1]}")
-
-            tmp_u = self.list_1.pop(0)
-            self.list_2.append(tmp_u)
-
-            if tmp_u.getTarget() == self.goal_position:
+                print(f"探索リスト: {[self.store.position(i) for i in self._open_nodes()]}")
+
+            tmp_u = heapq.heappop(self.list_1)[1]
+            if self.record:
+                self.list_2.append(tmp_u)
+            self.expanded_count += 1
+            u_key = self.store.cell[tmp_u]
+            self.index.set_closed(u_key)
+            if events:
+                yield (EXPAND, self.grid.position(u_key))
+
+            if u_key == goal_cell:
                 self.goal_flag = True
                 goal_node = tmp_u
                 if debug:
@@ -86,75 +150,99 @@ class Searcher:
 
             temp_list_1 = []
 
-            for idx in self.idx_list:
-                tmp_y = tmp_u.getTarget()[0] + idx[0]
-                tmp_x = tmp_u.getTarget()[1] + idx[1]
-
-                if (-1 < tmp_x < self.maze_size[1]) and (-1 < tmp_y < self.maze_size[0]):
-                    existing_open = next((e for e in self.list_1 if e.getTarget() == [tmp_y, tmp_x]), None)
-                    existing_closed = next((e for e in self.list_2 if e.getTarget() == [tmp_y, tmp_x]), None)
-                    node_symbol = self.maze_list[tmp_y][tmp_x]
-
-                    if node_symbol in (self.load_symbol, self.goal_symbol):
-                        if existing_open is None and existing_closed is None:
-                            tmp_v = St()
-                            tmp_v.setTarget([tmp_y, tmp_x])
-                            tmp_v.setBeforeTarget(tmp_u.getTarget())
-                            tmp_v.setCost(tmp_u.getCost() + self.cost)
-                            tmp_v.setDistance(self.h(tmp_y, tmp_x, self.goal_position[0], self.goal_position[1]))
-                            self.list_1.append(tmp_v)
-
-                            temp_list_1.append(tmp_v.getTarget())
-
-                        elif existing_open is not None and (new_g := tmp_u.getCost() + self.cost) < existing_open.getCost():
-                            existing_open.setCost(new_g)
-                            existing_open.setBeforeTarget(tmp_u.getTarget())
-
-                        elif existing_closed is not None and (new_g := tmp_u.getCost() + self.cost) < existing_closed.getCost():
+            for offset in self.offsets:
+                key = u_key + offset
+
+                # 外周は壁なので範囲チェックは不要
+                if self.grid.cells[key] & PASSABLE:
+                    new_g = self.store.g[tmp_u] + self.cost
+                    if self.index.is_new(key):
+                        if self.h_field is None:
+                            tmp_y, tmp_x = self.grid.position(key)
+                            h = self.h(tmp_y, tmp_x, self.goal_position[0], self.goal_position[1])
+                        else:
+                            h = self.h_field[key]
+                        tmp_v = self.store.add(key, tmp_u, new_g, h)
+                        self.node_table[key] = tmp_v
+                        self.index.set_open(key)
+                        self._push(tmp_v)
+
+                        if track:
+                            position = self.grid.position(key)
+                            if self.record:
+                                temp_list_1.append(position)
+                            if events:
+                                yield (GENERATE, position)
+
+                    elif self.index.is_open(key) and new_g < self.store.g[self.node_table[key]]:
+                        existing_open = self.node_table[key]
+                        self.store.g[existing_open] = new_g
+                        self.store.parent[existing_open] = tmp_u
+                        self._push(existing_open)
+
+                    elif new_g < self.store.g[self.node_table[key]]:
+                        # 再オープンは新しいノード番号で末尾に登録し直す
+                        existing_closed = self.node_table[key]
+                        if self.record:
                             self.list_2.remove(existing_closed)
-                            existing_closed.setCost(new_g)
-                            existing_closed.setBeforeTarget(tmp_u.getTarget())
-                            self.list_1.append(existing_closed)
-
-                            temp_list_1.append(tmp_v.getTarget())
-
-                            print("再探索:", existing_closed.getTarget())
-
+                        tmp_v = self.store.add(key, tmp_u, new_g, self.store.h[existing_closed])
+                        self.node_table[key] = tmp_v
+                        self.index.set_open(key)
+                        self._push(tmp_v)
+
+                        if track:
+                            position = self.grid.position(key)
+                            if self.record:
+                                temp_list_1.append(position)
+                            if events:
+                                yield (GENERATE, position)
+
+                        if debug:
+                            print("再探索:", self.grid.position(key))
+
+                    if self.copy_list is not None:
+                        tmp_y, tmp_x = self.grid.position(key)
                         self.copy_list[tmp_y][tmp_x] = self.route_symbol
 
-                if debug:
+                if debug and self.copy_list is not None:
                     for row in self.copy_list:
                         print([item for item in row])
                     print("\n")
 
-            self.list_1_record.append(temp_list_1)
-
-            self.list_1.sort(key=lambda n: n.getCost() + n.getDistance())
+            if self.record:
+                self.list_1_record.append(temp_list_1)
 
         if self.goal_flag:
-            tmp = goal_node
-            while True:
-                self.maze_list[tmp.getTarget()[0]][tmp.getTarget()[1]] = self.route_symbol
-                self.results_path.append(tmp.getTarget())
-                if tmp.getTarget() == self.start_position:
-                    break
-                tmp = next((e for e in self.list_2 if e.getTarget() == tmp.getBeforeTarget()), None)
+            # 親ノードをたどるので，復元は経路長に比例する時間で済む
+            self.results_path = self.store.path_to(goal_node)
+        if events:
+            yield (FINISH, self.goal_flag)
 
     def print_maze(self, maze=None, label="地図"):
         if maze is None:
-            maze = self.maze_list
+            maze = self.get_result().to_symbols(self.start_symbol, self.goal_symbol, self.load_symbol,
+                                                self.wall_symbol, self.route_symbol)
         print(label + ":")
         for row in maze:
             print([item for item in row])
 
     def get_results_path(self):
         return self.results_path
+
+    def get_result(self):
+        return SearchResult(self.grid, self.results_path, self.goal_flag, self.get_path_cost(), self.expanded_count)
+
+    def get_path_cost(self):
+        return (len(self.results_path) - 1) * self.cost if self.results_path else None
+
+    def get_expanded_count(self):
+        return self.expanded_count
     
     def get_list_1(self):
-        return self.list_1
+        return NodeList(self.store, self._open_nodes())
     
     def get_list_2(self):
-        return self.list_2
+        return NodeList(self.store, self.list_2)
     
     def get_list_1_records(self):
         return self.list_1_record
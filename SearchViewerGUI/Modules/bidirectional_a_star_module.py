@@ -0,0 +1,274 @@
+import heapq
+from array import array
+try:
+    from .structure import NodeStore, NodeList  # 相対インポート
+    from .grid_map import compile_maze, PASSABLE
+    from .search_events import GENERATE, EXPAND, GENERATE_BACKWARD, EXPAND_BACKWARD, FINISH
+    from .search_result import SearchResult
+    from .heuristics import get_heuristic, heuristic_field
+except ImportError:
+    from structure import NodeStore, NodeList  # 絶対インポート
+    from grid_map import compile_maze, PASSABLE
+    from search_events import GENERATE, EXPAND, GENERATE_BACKWARD, EXPAND_BACKWARD, FINISH
+    from search_result import SearchResult
+    from heuristics import get_heuristic, heuristic_field
+
+# 各側のイベントの種類: (GENERATE, EXPAND)
+SIDE_EVENTS = ((GENERATE, EXPAND), (GENERATE_BACKWARD, EXPAND_BACKWARD))
+
+FORWARD = 0  # スタート側（ゴールへの推定距離を使う）
+BACKWARD = 1  # ゴール側（スタートへの推定距離を使う）
+
+class Searcher:
+    """スタートとゴールの両側から A* を進め，出会ったところで止める双方向 A*．
+
+    毎回オープンリストの小さい側を 1 ノード展開する．合流した経路の歩数を μ として，
+    どちらかのオープンリストの最小の f が μ 以上になったら終了する．
+    順序付けと終了判定は歩数 + 推定距離で行うので，passed_cost に関係なく最短経路を返す．
+    """
+
+    def __init__(self, maze_list, passed_cost=0.5,
+             start_symbol="@", goal_symbol="*",
+             load_symbol=".", wall_symbol="#", route_symbol="■",
+             heuristic="euclidean", precompute_heuristic=False, record=True):
+
+        # 引数で渡された設定値
+        self.maze_list = maze_list
+        self.cost = passed_cost
+        self.start_symbol = start_symbol
+        self.goal_symbol = goal_symbol
+        self.load_symbol = load_symbol
+        self.wall_symbol = wall_symbol
+        self.route_symbol = route_symbol
+        self.record = record  # False なら表示用の記録（list_1_record, list_2, list_2_sides）を作らない
+        self.heuristic = get_heuristic(heuristic)  # euclidean, manhattan, octile, chebyshev
+
+        # 構造と位置関係（展開順は a_star_module と同じ：上，右，下，左）
+        self.idx_list = [[-1, 0], [0, 1], [1, 0], [0, -1]]
+        self.grid = compile_maze(maze_list, start_symbol, goal_symbol, load_symbol)
+        self.maze_size = [self.grid.rows, self.grid.cols]
+        self.offsets = self.grid.neighbor_offsets(self.idx_list)
+
+        # 状態管理用（両側のノードを 1 つの NodeStore に入れる）
+        self.open_lists = [[], []]  # 各側の (歩数 + 推定距離, ノード番号, 歩数) の二分ヒープ
+        self.list_2 = array("i")
+        self.list_2_sides = array("b")  # list_2 の各ノードがどちら側から展開されたか
+        self.node_tables = [array("i", [-1]) * len(self.grid) for _ in range(2)]  # 各側のセル番号 -> ノード番号
+        self.closed = [bytearray(len(self.grid)) for _ in range(2)]
+        self.store = NodeStore(self.grid)  # g には歩数 × passed_cost を入れる
+        self.steps = {}  # ノード番号 -> 自分の側の根からの歩数
+        self.goal_flag = False
+        self.results_path = []
+        self.expanded_count = 0
+
+        self.list_1_record = []  # 各展開ごとのL1リスト記録
+
+        # スタート／ゴール地点
+        self.start_position = self.grid.get_start_position()
+        self.goal_position = self.grid.get_goal_position()
+
+        # 推定距離の表（スタート側はゴールまで，ゴール側はスタートまで）
+        self.h_fields = None
+        if precompute_heuristic and self.start_position and self.goal_position:
+            self.h_fields = [heuristic_field(heuristic, tuple(self.goal_position), *self.maze_size),
+                             heuristic_field(heuristic, tuple(self.start_position), *self.maze_size)]
+
+    def _h(self, side, cell):
+        if self.h_fields is not None:
+            return self.h_fields[side][cell]
+        target = self.goal_position if side == FORWARD else self.start_position
+        y, x = self.grid.position(cell)
+        return self.heuristic(abs(y - target[0]), abs(x - target[1]))
+
+    def _push(self, side, node):
+        steps = self.steps[node]
+        heapq.heappush(self.open_lists[side], (steps + self.store.h[node], node, steps))
+
+    def _discard_stale(self, side):
+        # コスト更新や展開済みで古くなったエントリを先頭から取り除く（遅延削除）
+        heap = self.open_lists[side]
+        while heap and (heap[0][2] != self.steps[heap[0][1]]
+                        or self.closed[side][self.store.cell[heap[0][1]]]):
+            heapq.heappop(heap)
+
+    def _open_nodes(self, side):
+        return [node for _, node, steps in sorted(self.open_lists[side])
+                if steps == self.steps[node] and not self.closed[side][self.store.cell[node]]]
+
+    def _add_root(self, side, cell):
+        node = self.store.add(cell, -1, 0.0, self._h(side, cell))
+        self.steps[node] = 0
+        self.node_tables[side][cell] = node
+        self._push(side, node)
+
+    def search(self, debug=False):
+        for _ in self._search(debug, events=False):
+            pass
+
+    def search_iter(self, debug=False):
+        # 探索の途中経過を (種類, 値) のイベントとして順に返す
+        return self._search(debug, events=True)
+
+    def _search(self, debug, events):
+        # events が False ならイベントを作らない（search() はこれを最後まで回すだけ）
+        if not self.start_position or not self.goal_position:
+            raise ValueError("スタート地点またはゴール地点が見つかりません")
+
+        self._add_root(FORWARD, self.grid.start_cell)
+        self._add_root(BACKWARD, self.grid.goal_cell)
+        if self.record:
+            self.list_1_record.append([self.start_position, self.goal_position])
+        if events:
+            yield (GENERATE, self.start_position)
+            yield (GENERATE_BACKWARD, self.goal_position)
+        track = self.record or events  # 座標を作る必要があるか
+        best = None  # (μ（歩数）, スタート側ノード, ゴール側ノード)
+        if self.grid.start_cell == self.grid.goal_cell:
+            # 生成のときにしか合流を調べないので，根どうしはここで合流させる（μ = 0 なので最初の判定で止まる）
+            best = (0, self.node_tables[FORWARD][self.grid.start_cell], self.node_tables[BACKWARD][self.grid.goal_cell])
+
+        while True:
+            self._discard_stale(FORWARD)
+            self._discard_stale(BACKWARD)
+            heaps = self.open_lists
+            if not heaps[FORWARD] or not heaps[BACKWARD]:
+                break
+            # どちらかの側の最小の f が μ 以上なら，μ より短い経路は残っていない
+            if best is not None and max(heaps[FORWARD][0][0], heaps[BACKWARD][0][0]) >= best[0]:
+                break
+
+            side = FORWARD if len(heaps[FORWARD]) <= len(heaps[BACKWARD]) else BACKWARD
+            table = self.node_tables[side]
+            other_table = self.node_tables[1 - side]
+            generate_event, expand_event = SIDE_EVENTS[side]
+
+            if debug:
+                print(f"{'スタート' if side == FORWARD else 'ゴール'}側の探索リスト: "
+                      f"{[self.store.position(i) for i in self._open_nodes(side)]}")
+
+            tmp_u = heapq.heappop(heaps[side])[1]
+            if self.record:
+                self.list_2.append(tmp_u)
+                self.list_2_sides.append(side)
+            self.expanded_count += 1
+            u_cell = self.store.cell[tmp_u]
+            self.closed[side][u_cell] = 1
+            if events:
+                yield (expand_event, self.grid.position(u_cell))
+            temp_list_1 = []
+
+            for offset in self.offsets:
+                key = u_cell + offset
+
+                # 外周は壁なので範囲チェックは不要
+                if not self.grid.cells[key] & PASSABLE:
+                    continue
+                new_steps = self.steps[tmp_u] + 1
+                tmp_v = table[key]
+                if tmp_v == -1:
+                    tmp_v = self.store.add(key, tmp_u, new_steps * self.cost, self._h(side, key))
+                    self.steps[tmp_v] = new_steps
+                    table[key] = tmp_v
+                    if track:
+                        position = self.grid.position(key)
+                        if self.record:
+                            temp_list_1.append(position)
+                        if events:
+                            yield (generate_event, position)
+                elif new_steps < self.steps[tmp_v]:
+                    # オープンならコストを下げ，展開済みなら再オープンする
+                    self.steps[tmp_v] = new_steps
+                    self.store.g[tmp_v] = new_steps * self.cost
+                    self.store.parent[tmp_v] = tmp_u
+                    self.closed[side][key] = 0
+                else:
+                    continue
+                self._push(side, tmp_v)
+
+                # 反対側がすでに到達していれば，そこで 2 つの探索木がつながる
+                other = other_table[key]
+                if other != -1:
+                    mu = new_steps + self.steps[other]
+                    if best is None or mu < best[0]:
+                        best = (mu, tmp_v, other) if side == FORWARD else (mu, other, tmp_v)
+
+            if self.record:
+                self.list_1_record.append(temp_list_1)
+
+        if best is None:
+            if debug:
+                print("探索失敗")
+            if events:
+                yield (FINISH, False)
+            return
+
+        self.goal_flag = True
+        if debug:
+            print(f"探索成功: {self.store.position(best[1])} で合流")
+        # スタート側は合流点まで，ゴール側は合流点の次からゴールまで
+        self.results_path = self.store.path_to(best[1]) + self.store.path_to(best[2])[::-1][1:]
+        if events:
+            yield (FINISH, True)
+
+    def print_maze(self, maze=None, label="地図"):
+        if maze is None:
+            maze = self.get_result().to_symbols(self.start_symbol, self.goal_symbol, self.load_symbol,
+                                                self.wall_symbol, self.route_symbol)
+        print(label + ":")
+        for row in maze:
+            print([item for item in row])
+
+    def get_results_path(self):
+        return self.results_path
+
+    def get_result(self):
+        return SearchResult(self.grid, self.results_path, self.goal_flag, self.get_path_cost(), self.expanded_count)
+
+    def get_path_cost(self):
+        return (len(self.results_path) - 1) * self.cost if self.results_path else None
+
+    def get_expanded_count(self):
+        return self.expanded_count
+
+    def get_list_1(self):
+        return NodeList(self.store, self._open_nodes(FORWARD) + self._open_nodes(BACKWARD))
+
+    def get_list_2(self):
+        return NodeList(self.store, self.list_2)
+
+    def get_list_2_sides(self):
+        # get_list_2 と同じ順に，スタート側なら 0，ゴール側なら 1
+        return self.list_2_sides
+
+    def get_list_1_records(self):
+        return self.list_1_record
+
+    def get_goal_flag(self):
+        return self.goal_flag
+
+    def get_start_position(self):
+        return self.start_position
+
+    def get_goal_position(self):
+        return self.goal_position
+
+if __name__ == "__main__":
+    maze_list = [
+        ["@",".",".",".","."],
+        [".",".",".",".","."],
+        [".",".",".","#","."],
+        [".",".","#","#","."],
+        [".",".",".",".","*"],
+    ]
+
+    searcher = Searcher(maze_list)
+    searcher.search(debug=True)
+    print(f"list_2: {[i.getTarget() for i in searcher.get_list_2()]}")
+    print(f"list_2 の展開側: {list(searcher.get_list_2_sides())}")
+    print(f"list_1_records: {searcher.get_list_1_records()}")
+    searcher.print_maze(label="経路")
+
+    # スタートとゴールが同じセルなら，2 つの根がそのまま合流点になる（経路 1 セル，コスト 0）
+    searcher = Searcher(searcher.grid.with_endpoints([1, 1], [1, 1]))
+    searcher.search()
+    print("start == goal:", searcher.get_goal_flag(), searcher.get_results_path(), searcher.get_path_cost())
@@ -0,0 +1,222 @@
+from array import array
+try:
+    from .structure import NodeStore, NodeList  # 相対インポート
+    from .grid_map import compile_maze, PASSABLE
+    from .search_events import GENERATE, EXPAND, GENERATE_BACKWARD, EXPAND_BACKWARD, FINISH
+    from .search_result import SearchResult
+except ImportError:
+    from structure import NodeStore, NodeList  # 絶対インポート
+    from grid_map import compile_maze, PASSABLE
+    from search_events import GENERATE, EXPAND, GENERATE_BACKWARD, EXPAND_BACKWARD, FINISH
+    from search_result import SearchResult
+
+# 各側のイベントの種類: (GENERATE, EXPAND)
+SIDE_EVENTS = ((GENERATE, EXPAND), (GENERATE_BACKWARD, EXPAND_BACKWARD))
+
+FORWARD = 0  # スタート側
+BACKWARD = 1  # ゴール側
+
+class Searcher:
+    """スタートとゴールの両側から 1 階層ずつ広げ，出会ったところで止める双方向 BFS．
+
+    毎回ノードの少ない側の階層を展開する．出会った階層は最後まで展開してから
+    最短の組み合わせを選ぶので，経路長は bfs_module と同じになる．
+    """
+
+    def __init__(self, maze_list, passed_cost=0.5,
+             start_symbol="@", goal_symbol="*",
+             load_symbol=".", wall_symbol="#", route_symbol="■", record=True):
+
+        # 引数で渡された設定値
+        self.maze_list = maze_list
+        self.cost = passed_cost
+        self.start_symbol = start_symbol
+        self.goal_symbol = goal_symbol
+        self.load_symbol = load_symbol
+        self.wall_symbol = wall_symbol
+        self.route_symbol = route_symbol
+        self.record = record  # False なら表示用の記録（list_1_record, list_2, list_2_sides）を作らない
+
+        # 構造と位置関係（探索順は bfs_module と同じ：上，右，下，左）
+        self.idx_list = [[-1, 0], [0, 1], [1, 0], [0, -1]]
+        self.grid = compile_maze(maze_list, start_symbol, goal_symbol, load_symbol)
+        self.maze_size = [self.grid.rows, self.grid.cols]
+        self.offsets = self.grid.neighbor_offsets(self.idx_list)
+
+        # 状態管理用（両側のノードを 1 つの NodeStore に入れ，h には深さを入れる）
+        self.frontiers = [[], []]  # 各側の現在の階層（ノード番号）
+        self.list_2 = array("i")
+        self.list_2_sides = array("b")  # list_2 の各ノードがどちら側から展開されたか
+        self.node_tables = [array("i", [-1]) * len(self.grid) for _ in range(2)]  # 各側のセル番号 -> ノード番号
+        self.store = NodeStore(self.grid)
+        self.goal_flag = False
+        self.results_path = []
+        self.expanded_count = 0
+
+        self.list_1_record = []  # 各展開ごとのL1リスト記録
+
+        # スタート／ゴール地点
+        self.start_position = self.grid.get_start_position()
+        self.goal_position = self.grid.get_goal_position()
+
+    def _add_root(self, side, cell):
+        node = self.store.add(cell)
+        self.node_tables[side][cell] = node
+        self.frontiers[side].append(node)
+
+    def search(self, debug=False):
+        for _ in self._search(debug, events=False):
+            pass
+
+    def search_iter(self, debug=False):
+        # 探索の途中経過を (種類, 値) のイベントとして順に返す
+        return self._search(debug, events=True)
+
+    def _search(self, debug, events):
+        # events が False ならイベントを作らない（search() はこれを最後まで回すだけ）
+        if not self.start_position or not self.goal_position:
+            raise ValueError("スタート地点またはゴール地点が見つかりません")
+
+        self._add_root(FORWARD, self.grid.start_cell)
+        self._add_root(BACKWARD, self.grid.goal_cell)
+        if self.record:
+            self.list_1_record.append([self.start_position, self.goal_position])
+        if events:
+            yield (GENERATE, self.start_position)
+            yield (GENERATE_BACKWARD, self.goal_position)
+        track = self.record or events  # 座標を作る必要があるか
+        meet = None  # (スタート側ノード, ゴール側ノード)
+        if self.grid.start_cell == self.grid.goal_cell:
+            # 生成のときにしか合流を調べないので，根どうしはここで合流させる
+            meet = (self.node_tables[FORWARD][self.grid.start_cell], self.node_tables[BACKWARD][self.grid.goal_cell])
+
+        while meet is None and self.frontiers[FORWARD] and self.frontiers[BACKWARD]:
+            side = FORWARD if len(self.frontiers[FORWARD]) <= len(self.frontiers[BACKWARD]) else BACKWARD
+            table = self.node_tables[side]
+            other_table = self.node_tables[1 - side]
+            generate_event, expand_event = SIDE_EVENTS[side]
+            next_frontier = []
+            best = None
+
+            if debug:
+                print(f"{'スタート' if side == FORWARD else 'ゴール'}側の探索リスト: "
+                      f"{[self.store.position(i) for i in self.frontiers[side]]}")
+
+            for tmp_u in self.frontiers[side]:
+                if self.record:
+                    self.list_2.append(tmp_u)
+                    self.list_2_sides.append(side)
+                self.expanded_count += 1
+                u_cell = self.store.cell[tmp_u]
+                if events:
+                    yield (expand_event, self.grid.position(u_cell))
+                temp_list_1 = []
+
+                for offset in self.offsets:
+                    cell_id = u_cell + offset
+
+                    # 外周は壁なので範囲チェックは不要
+                    if self.grid.cells[cell_id] & PASSABLE and table[cell_id] == -1:
+                        tmp_v = self.store.add(cell_id, tmp_u, self.store.g[tmp_u] + self.cost,
+                                               self.store.h[tmp_u] + 1)
+                        table[cell_id] = tmp_v
+                        next_frontier.append(tmp_v)
+                        if track:
+                            position = self.grid.position(cell_id)
+                            if self.record:
+                                temp_list_1.append(position)
+                            if events:
+                                yield (generate_event, position)
+
+                        # 反対側がすでに到達していれば，そこで 2 つの探索木がつながる
+                        other = other_table[cell_id]
+                        if other != -1:
+                            depth = self.store.h[tmp_v] + self.store.h[other]
+                            if best is None or depth < best[0]:
+                                best = (depth, tmp_v, other) if side == FORWARD else (depth, other, tmp_v)
+
+                if self.record:
+                    self.list_1_record.append(temp_list_1)
+
+            self.frontiers[side] = next_frontier
+            if best is not None:
+                meet = best[1:]
+                break
+
+        if meet is None:
+            if debug:
+                print("探索失敗")
+            if events:
+                yield (FINISH, False)
+            return
+
+        self.goal_flag = True
+        if debug:
+            print(f"探索成功: {self.store.position(meet[0])} で合流")
+        # スタート側は合流点まで，ゴール側は合流点の次からゴールまで
+        self.results_path = self.store.path_to(meet[0]) + self.store.path_to(meet[1])[::-1][1:]
+        if events:
+            yield (FINISH, True)
+
+    def print_maze(self, maze=None, label="地図"):
+        if maze is None:
+            maze = self.get_result().to_symbols(self.start_symbol, self.goal_symbol, self.load_symbol,
+                                                self.wall_symbol, self.route_symbol)
+        print(label + ":")
+        for row in maze:
+            print([item for item in row])
+
+    def get_results_path(self):
+        return self.results_path
+
+    def get_result(self):
+        return SearchResult(self.grid, self.results_path, self.goal_flag, self.get_path_cost(), self.expanded_count)
+
+    def get_path_cost(self):
+        return (len(self.results_path) - 1) * self.cost if self.results_path else None
+
+    def get_expanded_count(self):
+        return self.expanded_count
+
+    def get_list_1(self):
+        return NodeList(self.store, self.frontiers[FORWARD] + self.frontiers[BACKWARD])
+
+    def get_list_2(self):
+        return NodeList(self.store, self.list_2)
+
+    def get_list_2_sides(self):
+        # get_list_2 と同じ順に，スタート側なら 0，ゴール側なら 1
+        return self.list_2_sides
+
+    def get_list_1_records(self):
+        return self.list_1_record
+
+    def get_goal_flag(self):
+        return self.goal_flag
+
+    def get_start_position(self):
+        return self.start_position
+
+    def get_goal_position(self):
+        return self.goal_position
+
+if __name__ == "__main__":
+    maze_list = [
+        ["@",".",".",".","."],
+        [".",".",".",".","."],
+        [".",".",".","#","."],
+        [".",".","#","#","."],
+        [".",".",".",".","*"],
+    ]
+
+    searcher = Searcher(maze_list)
+    searcher.search(debug=True)
+    print(f"list_2: {[i.getTarget() for i in searcher.get_list_2()]}")
+    print(f"list_2 の展開側: {list(searcher.get_list_2_sides())}")
+    print(f"list_1_records: {searcher.get_list_1_records()}")
+    searcher.print_maze(label="経路")
+
+    # スタートとゴールが同じセルなら，2 つの根がそのまま合流点になる（経路 1 セル，コスト 0）
+    searcher = Searcher(searcher.grid.with_endpoints([1, 1], [1, 1]))
+    searcher.search()
+    print("start == goal:", searcher.get_goal_flag(), searcher.get_results_path(), searcher.get_path_cost())
@@ -0,0 +1,50 @@
+import mmap
+from array import array
+
+# セルの状態
+NEW = 0  # 未登録
+OPEN = 1  # L1（オープンリスト）に格納中
+CLOSED = 2  # L2（クローズドリスト）に格納済み
+
+# これより大きな表は無名の mmap で確保する（OS が 0 で埋めたページを触ったときに割り当てるので，
+# 巨大な地図の一部だけを探索しても，表全体のメモリを使わない）
+LAZY_BUFFER_BYTES = 1 << 24
+
+
+def cell_buffer(size):
+    # 0 で埋めた書き換えられるバッファ（セル番号で引く探索の状態用）
+    return mmap.mmap(-1, size) if size >= LAZY_BUFFER_BYTES else bytearray(size)
+
+
+def cell_table(size):
+    # 0 で埋めた int の表（セル番号 -> ノード番号など）．大きいときは cell_buffer と同じく触った分だけ確保する
+    itemsize = array("i").itemsize
+    if size * itemsize >= LAZY_BUFFER_BYTES:
+        return memoryview(mmap.mmap(-1, size * itemsize)).cast("i")
+    return array("i", [0]) * size
+
+
+class CellIndex:
+    """GridMap のセル番号をキーにした L1/L2 の所属表．
+
+    リストを走査せずに定数時間で重複確認をするために各 Searcher で共有する．
+    """
+
+    def __init__(self, size):
+        self.state = cell_buffer(size)
+
+    def is_new(self, cell_id):
+        return self.state[cell_id] == NEW
+
+    def is_open(self, cell_id):
+        return self.state[cell_id] == OPEN
+
+    def is_closed(self, cell_id):
+        return self.state[cell_id] == CLOSED
+
+    def set_open(self, cell_id):
+        self.state[cell_id] = OPEN
+
+    def set_closed(self, cell_id):
+        self.state[cell_id] = CLOSED
+
@@ -1,14 +1,23 @@
-import copy
+from array import array
 try:
-    from .structure import Structure as St  # 相対インポート
+    from .structure import NodeStore, NodeList  # 相対インポート
+    from .cell_index import CellIndex
+    from .grid_map import compile_maze, render_maze, PASSABLE
+    from .search_events import GENERATE, EXPAND, FINISH
+    from .search_result import SearchResult
 except ImportError:
-    from structure import Structure as St  # 絶対インポート
+    from structure import NodeStore, NodeList  # 絶対インポート
+    from cell_index import CellIndex
+    from grid_map import compile_maze, render_maze, PASSABLE
+    from search_events import GENERATE, EXPAND, FINISH
+    from search_result import SearchResult
 import math
 
 class Searcher:
     def __init__(self, maze_list, passed_cost=0.5,
              start_symbol="@", goal_symbol="*",
-             load_symbol=".", wall_symbol="#", route_symbol="■"):
+             load_symbol=".", wall_symbol="#", route_symbol="■",
+             record=True):
 
         # 引数で渡された設定値
         self.maze_list = maze_list
@@ -18,29 +27,33 @@ class Searcher:
         self.load_symbol = load_symbol
         self.wall_symbol = wall_symbol
         self.route_symbol = route_symbol
+        self.record = record  # False なら表示用の記録（list_1_record, list_2）を作らない
 
-        # 構造と位置関係
-        self.copy_list = copy.deepcopy(maze_list)
-        self.maze_size = [len(maze_list), len(maze_list[0])]
+        # 構造と位置関係（copy_list はデバッグ表示用．search(debug=True) のときだけ地図から作る）
+        self.copy_list = None
         # 右，下，左，上
         self.idx_list = [[0, 1], [1, 0], [0, -1], [-1, 0]]
         self.idx_len = len(self.idx_list)
 
+        # 1 セル 1 バイトに変換した地図と，探索順に並べた隣接セルのオフセット表
+        self.grid = compile_maze(maze_list, start_symbol, goal_symbol, load_symbol)
+        self.maze_size = [self.grid.rows, self.grid.cols]
+        self.offsets = self.grid.neighbor_offsets(self.idx_list)
+
         # 状態管理用
         self.list_1 = []
-        self.list_2 = []
+        self.list_2 = array("i")
+        self.index = CellIndex(len(self.grid))  # L1/L2 の所属表
+        self.store = NodeStore(self.grid)  # ノード情報（list_1/list_2 はノード番号を持つ）
         self.goal_flag = False
         self.results_path = []
+        self.expanded_count = 0
 
         self.list_1_record = []  # 各展開ごとのL1リスト記録
 
         # スタート／ゴール地点
-        self.start_position = self._find_symbol(self.start_symbol)
-        self.goal_position = self._find_symbol(self.goal_symbol)
-
-    def _find_symbol(self, symbol):
-        return next(([i, j] for i, row in enumerate(self.maze_list) 
-                     for j, item in enumerate(row) if item == symbol), None)
+        self.start_position = self.grid.get_start_position()
+        self.goal_position = self.grid.get_goal_position()
 
     def euclideanDistance(self, x1, y1, x2, y2):
         return ((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5
@@ -49,14 +62,31 @@ class Searcher:
         return self.euclideanDistance(x1, y1, x2, y2)
 
     def search(self, debug=False):
+        for _ in self._search(debug, events=False):
+            pass
+
+    def search_iter(self, debug=False):
+        # 探索の途中経過を (種類, 値) のイベントとして順に返す
+        return self._search(debug, events=True)
+
+    def _search(self, debug, events):
+        # events が False ならイベントを作らない（search() はこれを最後まで回すだけ）
         if not self.start_position or not self.goal_position:
             raise ValueError("スタート地点またはゴール地点が見つかりません")
+        if debug:
+            self.copy_list = render_maze(self.grid, self.start_symbol, self.goal_symbol,
+                                         self.load_symbol, self.wall_symbol)
 
-        start_node = St()
-        start_node.setTarget(self.start_position)
+        goal_cell = self.grid.goal_cell
+        start_node = self.store.add(self.grid.start_cell)
         self.list_1.append(start_node)
-        self.list_1_record.append([start_node.getTarget()])
-        goal_node = St()
+        self.index.set_open(self.store.cell[start_node])
+        if self.record:
+            self.list_1_record.append([self.start_position])
+        if events:
+            yield (GENERATE, self.start_position)
+        goal_node = -1
+        track = self.record or events  # 座標を作る必要があるか
 
         if debug:
             num = 0
@@ -72,12 +102,18 @@ class Searcher:
                 print(f"{num} 回目の探索")
 
             if debug:
-                print(f"探索リスト: {[i.getTarget() for i in self.list_1]}")
+                print(f"探索リスト: {[self.store.position(i) for i in self.list_1]}")
 
             tmp_u = self.list_1.pop()
-            self.list_2.append(tmp_u)
-
-            if tmp_u.getTarget() == self.goal_position:
+            if self.record:
+                self.list_2.append(tmp_u)
+            self.expanded_count += 1
+            u_cell = self.store.cell[tmp_u]
+            self.index.set_closed(u_cell)
+            if events:
+                yield (EXPAND, self.grid.position(u_cell))
+
+            if u_cell == goal_cell:
                 self.goal_flag = True
                 goal_node = tmp_u
                 if debug:
@@ -86,59 +122,66 @@ class Searcher:
 
             temp_list_1 = []
 
-            for idx in self.idx_list:
-                tmp_y = tmp_u.getTarget()[0] + idx[0]
-                tmp_x = tmp_u.getTarget()[1] + idx[1]
-
-                if (-1 < tmp_x < self.maze_size[1]) and (-1 < tmp_y < self.maze_size[0]):
-                    existing_open = next((e for e in self.list_1 if e.getTarget() == [tmp_y, tmp_x]), None)
-                    existing_closed = next((e for e in self.list_2 if e.getTarget() == [tmp_y, tmp_x]), None)
-                    node_symbol = self.maze_list[tmp_y][tmp_x]
-
-                    if node_symbol in (self.load_symbol, self.goal_symbol):
-                        if existing_open is None and existing_closed is None:
-                            tmp_v = St()
-                            tmp_v.setTarget([tmp_y, tmp_x])
-                            tmp_v.setBeforeTarget(tmp_u.getTarget())
-                            tmp_v.setCost(tmp_u.getCost() + self.cost)
-                            self.list_1.append(tmp_v)
-
-                            temp_list_1.append(tmp_v.getTarget())
-
+            for offset in self.offsets:
+                cell_id = u_cell + offset
+
+                # 外周は壁なので範囲チェックは不要
+                if self.grid.cells[cell_id] & PASSABLE:
+                    if self.index.is_new(cell_id):
+                        tmp_v = self.store.add(cell_id, tmp_u, self.store.g[tmp_u] + self.cost)
+                        self.list_1.append(tmp_v)
+                        self.index.set_open(cell_id)
+
+                        if track:
+                            position = self.grid.position(cell_id)
+                            if self.record:
+                                temp_list_1.append(position)
+                            if events:
+                                yield (GENERATE, position)
+
+                    if self.copy_list is not None:
+                        tmp_y, tmp_x = self.grid.position(cell_id)
                         self.copy_list[tmp_y][tmp_x] = self.route_symbol
 
-                if debug:
+                if debug and self.copy_list is not None:
                     for row in self.copy_list:
                         print([item for item in row])
                     print("\n")
 
-            self.list_1_record.append(temp_list_1)
+            if self.record:
+                self.list_1_record.append(temp_list_1)
 
         if self.goal_flag:
-            tmp = goal_node
-            while True:
-                self.maze_list[tmp.getTarget()[0]][tmp.getTarget()[1]] = self.route_symbol
-                self.results_path.append(tmp.getTarget())
-                if tmp.getTarget() == self.start_position:
-                    break
-                tmp = next((e for e in self.list_2 if e.getTarget() == tmp.getBeforeTarget()), None)
-            self.results_path.reverse()
+            # 親ノードをたどるので，復元は経路長に比例する時間で済む
+            self.results_path = self.store.path_to(goal_node)
+        if events:
+            yield (FINISH, self.goal_flag)
 
     def print_maze(self, maze=None, label="地図"):
         if maze is None:
-            maze = self.maze_list
+            maze = self.get_result().to_symbols(self.start_symbol, self.goal_symbol, self.load_symbol,
+                                                self.wall_symbol, self.route_symbol)
         print(label + ":")
         for row in maze:
             print([item for item in row])
 
     def get_results_path(self):
         return self.results_path
+
+    def get_result(self):
+        return SearchResult(self.grid, self.results_path, self.goal_flag, self.get_path_cost(), self.expanded_count)
+
+    def get_path_cost(self):
+        return (len(self.results_path) - 1) * self.cost if self.results_path else None
+
+    def get_expanded_count(self):
+        return self.expanded_count
     
     def get_list_1(self):
-        return self.list_1
+        return NodeList(self.store, list(self.list_1))
     
     def get_list_2(self):
-        return self.list_2
+        return NodeList(self.store, self.list_2)
     
     def get_list_1_records(self):
         return self.list_1_record
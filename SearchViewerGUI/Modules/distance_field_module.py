@@ -0,0 +1,221 @@
+import hashlib
+from array import array
+from collections import OrderedDict, deque
+try:
+    from .grid_map import compile_maze, WALL  # 相対インポート
+    from .search_events import FINISH
+    from .search_result import SearchResult
+except ImportError:
+    from grid_map import compile_maze, WALL  # 絶対インポート
+    from search_events import FINISH
+    from search_result import SearchResult
+
+# 壁かどうかだけを残す変換表（スタート／ゴールの位置は指紋に含めない）
+_WALL_MASK = bytes([0] + [1] * 255)
+_FINGERPRINT_CHUNK = 1 << 20
+
+
+def grid_fingerprint(grid):
+    # 地図の形と壁の配置から作る指紋（同じ地図ならスタート／ゴールが違っても同じ値）
+    # 大きな地図（mmap など）も一度に複製しないように，少しずつ読んで壁だけを残す
+    digest = hashlib.blake2b(digest_size=16)
+    for start in range(0, len(grid.cells), _FINGERPRINT_CHUNK):
+        digest.update(grid.cells[start:start + _FINGERPRINT_CHUNK].translate(_WALL_MASK))
+    return (grid.rows, grid.cols, digest.hexdigest())
+
+
+class DistanceField:
+    """ゴールから全セルへの歩数と，各セルからゴールへ 1 歩進む先のセル（フローフィールド）．
+
+    一様コストなので Dijkstra 法は BFS と同じになる．隣接セルの順は bfs_module と同じ（上，右，下，左）．
+    """
+
+    def __init__(self, grid, goal_cell):
+        self.grid = grid
+        self.goal_cell = goal_cell
+        self.offsets = grid.neighbor_offsets([[-1, 0], [0, 1], [1, 0], [0, -1]])
+        self.distance = array("i", [-1]) * len(grid)  # ゴールまでの歩数（届かなければ -1）
+        self.next_cell = array("i", [-1]) * len(grid)  # ゴールへ 1 歩進む先のセル番号
+        self.expanded_count = 0  # 表を作るときに BFS で展開したセルの数
+        self._build()
+
+    def _build(self):
+        cells = self.grid.cells
+        distance = self.distance
+        next_cell = self.next_cell
+        distance[self.goal_cell] = 0
+        queue = deque([self.goal_cell])
+        while queue:
+            u = queue.popleft()
+            self.expanded_count += 1
+            d = distance[u] + 1
+            for offset in self.offsets:
+                v = u + offset
+                # スタートも通過できるセルとして扱う（外周は壁）
+                if cells[v] != WALL and distance[v] == -1:
+                    distance[v] = d
+                    next_cell[v] = u
+                    queue.append(v)
+
+    def get_distance(self, position):
+        # ゴールまでの歩数（届かなければ None）
+        steps = self.distance[self.grid.cell_id(*position)]
+        return None if steps == -1 else steps
+
+    def path_from(self, position):
+        # position からゴールまでの経路（[y, x] のリスト）．届かなければ空のリスト
+        cell = self.grid.cell_id(*position)
+        if self.distance[cell] == -1:
+            return []
+        path = [self.grid.position(cell)]
+        while cell != self.goal_cell:
+            cell = self.next_cell[cell]
+            path.append(self.grid.position(cell))
+        return path
+
+
+class DistanceFieldCache:
+    # 地図の指紋とゴールのセル番号をキーに，最近使った maxsize 個の DistanceField を残す．
+    # grid_key を渡すと指紋の代わりに使う（地図全体を読まないので，問い合わせは地図の大きさによらない）．
+    # grid_key は壁の配置が変わったら変わる値にすること（GUI の Zobrist ハッシュや地図のファイル名など）
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self.fields = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, grid, goal_cell, grid_key=None):
+        key = (grid_fingerprint(grid) if grid_key is None else ("key", grid_key), goal_cell)
+        field = self.fields.get(key)
+        if field is not None:
+            self.hits += 1
+            self.fields.move_to_end(key)
+            return field
+
+        self.misses += 1
+        # 地図はあとで書き換えられても困らないように壁の配置ごと複製して持つ
+        snapshot = grid.copy()
+        field = DistanceField(snapshot, goal_cell)
+        self.fields[key] = field
+        if len(self.fields) > self.maxsize:
+            self.fields.popitem(last=False)
+        return field
+
+    def clear(self):
+        self.fields.clear()
+
+    def __len__(self):
+        return len(self.fields)
+
+
+# Searcher が共有する既定のキャッシュ
+default_cache = DistanceFieldCache()
+
+
+class Searcher:
+    """ゴールを根にした距離場をキャッシュから引き，スタートから流れをたどるだけで経路を返す．
+
+    同じ地図・同じゴールなら 2 回目以降はスタートがどこでも経路長に比例する時間で済む．
+    """
+
+    def __init__(self, maze_list, passed_cost=0.5,
+             start_symbol="@", goal_symbol="*",
+             load_symbol=".", wall_symbol="#", route_symbol="■",
+             cache=None, grid_key=None, record=True):
+
+        # 引数で渡された設定値
+        self.maze_list = maze_list
+        self.cost = passed_cost
+        self.start_symbol = start_symbol
+        self.goal_symbol = goal_symbol
+        self.load_symbol = load_symbol
+        self.wall_symbol = wall_symbol
+        self.route_symbol = route_symbol
+        self.cache = default_cache if cache is None else cache
+        self.grid_key = grid_key  # 地図を表すキー（None なら地図の指紋を計算する．DistanceFieldCache を参照）
+        self.record = record  # 表示用の記録はもともと作らないので，ほかの Searcher と揃えるためだけの引数
+
+        self.grid = compile_maze(maze_list, start_symbol, goal_symbol, load_symbol)
+        self.maze_size = [self.grid.rows, self.grid.cols]
+
+        # 状態管理用
+        self.field = None
+        self.goal_flag = False
+        self.results_path = []
+        self.expanded_count = 0  # キャッシュになく表を作ったときだけ，その BFS の展開数（キャッシュから引けば 0）
+
+        # スタート／ゴール地点
+        self.start_position = self.grid.get_start_position()
+        self.goal_position = self.grid.get_goal_position()
+
+    def search(self, debug=False):
+        for _ in self.search_iter(debug):
+            pass
+
+    def search_iter(self, debug=False):
+        # 距離場を引く（または作る）だけで探索の途中経過はないので，FINISH だけを返す
+        if not self.start_position or not self.goal_position:
+            raise ValueError("スタート地点またはゴール地点が見つかりません")
+
+        misses = self.cache.misses
+        self.field = self.cache.get(self.grid, self.grid.goal_cell, self.grid_key)
+        built = self.cache.misses > misses
+        self.expanded_count = self.field.expanded_count if built else 0
+        if debug:
+            print("距離場: " + ("新しく計算" if built else "キャッシュを利用"))
+
+        # スタートから「ゴールへ 1 歩進む先」をたどるので，経路はスタートからの順になる
+        self.results_path = self.field.path_from(self.start_position)
+        self.goal_flag = bool(self.results_path)
+        if debug:
+            print("探索成功" if self.goal_flag else "探索失敗")
+        yield (FINISH, self.goal_flag)
+
+    def print_maze(self, maze=None, label="地図"):
+        if maze is None:
+            maze = self.get_result().to_symbols(self.start_symbol, self.goal_symbol, self.load_symbol,
+                                                self.wall_symbol, self.route_symbol)
+        print(label + ":")
+        for row in maze:
+            print([item for item in row])
+
+    def get_results_path(self):
+        return self.results_path
+
+    def get_result(self):
+        return SearchResult(self.grid, self.results_path, self.goal_flag, self.get_path_cost(), self.expanded_count)
+
+    def get_path_cost(self):
+        return (len(self.results_path) - 1) * self.cost if self.results_path else None
+
+    def get_expanded_count(self):
+        return self.expanded_count
+
+    def get_distance_field(self):
+        return self.field
+
+    def get_goal_flag(self):
+        return self.goal_flag
+
+    def get_start_position(self):
+        return self.start_position
+
+    def get_goal_position(self):
+        return self.goal_position
+
+if __name__ == "__main__":
+    maze_list = [
+        [".",".",".",".","."],
+        [".",".",".",".","."],
+        [".",".",".","#","."],
+        [".",".","#","#","."],
+        [".",".",".",".","*"],
+    ]
+
+    for start in ([0, 0], [2, 0], [4, 0]):
+        maze = [row[:] for row in maze_list]
+        maze[start[0]][start[1]] = "@"
+        searcher = Searcher(maze)
+        searcher.search(debug=True)
+        print(f"スタート {start}: 経路長 {len(searcher.get_results_path())}")
+    print(f"キャッシュ: ヒット {default_cache.hits} 回, 計算 {default_cache.misses} 回")
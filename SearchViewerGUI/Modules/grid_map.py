@@ -0,0 +1,235 @@
+# セルの種類（下位ビットが 1 のセルに進入できる）
+WALL = 0
+ROAD = 1
+START = 2
+GOAL = 3
+PASSABLE = 1
+
+
+class GridMap:
+    """迷路を 1 セル 1 バイトの平坦な配列にしたもの．
+
+    外周に壁を 1 マスずつ足してあるので，隣接セルは範囲チェックなしで
+    「セル番号 + オフセット」で求められる．
+    cells を渡すと，その並び（bytes, bytearray, mmap など）を複製せずにそのまま使う．
+    """
+
+    def __init__(self, rows, cols, cells=None):
+        self.rows = rows
+        self.cols = cols
+        self.stride = cols + 2
+        if cells is None:
+            cells = bytearray(self.stride * (rows + 2))
+        elif len(cells) != self.stride * (rows + 2):
+            raise ValueError("セルの数が外周の壁を含めた地図の大きさと合いません")
+        self.cells = cells
+        self.start_cell = -1
+        self.goal_cell = -1
+
+    def __len__(self):
+        return len(self.cells)
+
+    def cell_id(self, y, x):
+        return (y + 1) * self.stride + x + 1
+
+    def position(self, cell_id):
+        y, x = divmod(cell_id, self.stride)
+        return [y - 1, x - 1]
+
+    def is_passable(self, cell_id):
+        return self.cells[cell_id] & PASSABLE
+
+    def neighbor_offsets(self, idx_list):
+        # [dy, dx] の並びをセル番号のオフセットに変換する（探索順はそのまま）
+        return [dy * self.stride + dx for dy, dx in idx_list]
+
+    def get_start_position(self):
+        return None if self.start_cell == -1 else self.position(self.start_cell)
+
+    def get_goal_position(self):
+        return None if self.goal_cell == -1 else self.position(self.goal_cell)
+
+    def find_endpoints(self):
+        # スタート／ゴールは最初に見つかったもの
+        self.start_cell = self.cells.find(bytes([START]))
+        self.goal_cell = self.cells.find(bytes([GOAL]))
+
+    def with_endpoints(self, start, goal):
+        # セルを共有したまま，スタート／ゴールだけを [y, x] で決め直した GridMap（シナリオの一括実行用）
+        for y, x in (start, goal):
+            if not (0 <= y < self.rows and 0 <= x < self.cols):
+                raise ValueError("スタート地点またはゴール地点が地図の範囲外です")
+        grid = GridMap(self.rows, self.cols, self.cells)
+        grid.start_cell = self.cell_id(*start)
+        grid.goal_cell = self.cell_id(*goal)
+        return grid
+
+    def copy(self):
+        # 複製は常に書き換えられる bytearray（mmap やタイル順の地図も行優先に並べ直す）
+        cells = self.cells[:]
+        grid = GridMap(self.rows, self.cols, cells if isinstance(cells, bytearray) else bytearray(cells))
+        grid.start_cell = self.start_cell
+        grid.goal_cell = self.goal_cell
+        return grid
+
+
+def symbol_byte(symbol):
+    # バッファの中の記号の 1 バイトの値（int はそのまま使うので，セルの種類の配列も読める）
+    if isinstance(symbol, int):
+        return symbol
+    if isinstance(symbol, str):
+        try:
+            symbol = symbol.encode("latin-1")
+        except UnicodeEncodeError:
+            symbol = b""
+    if len(symbol) != 1:
+        raise ValueError("バッファから読む地図の記号は 1 バイトで表せる 1 文字にしてください")
+    return symbol[0]
+
+
+class MazeBuffer:
+    """1 セル 1 バイトの記号が行ごとに並んだバッファ（bytes, bytearray, memoryview, mmap, NumPy 配列など）．
+
+    stride は行の先頭どうしの間隔（改行や詰め物の分だけ cols より長くてよい），offset は最初の行の位置．
+    バッファは読むだけで書き換えない．
+    """
+
+    def __init__(self, buffer, rows, cols, stride=None, offset=0):
+        self.buffer = buffer
+        self.rows = rows
+        self.cols = cols
+        self.stride = cols if stride is None else stride
+        self.offset = offset
+
+
+BUFFER_BLOCK_BYTES = 1 << 20  # バッファの地図を変換するときに一度に読む量
+
+
+def compile_maze(maze_list, start_symbol="@", goal_symbol="*", load_symbol="."):
+    """迷路を GridMap に変換する（それ以外の記号はすべて壁）．受け取れるのは次のもの：
+
+    - GridMap：複製せずにそのまま使う（Searcher は地図を書き換えないので，いくつもの探索で共有できる）．
+      外周の壁を含めたセルの種類の並びがすでにあれば，GridMap(rows, cols, cells) で包んで渡す
+    - 行のリスト：各行は記号のリスト（色名など何でもよい），文字列，bytes のどれか
+    - MazeBuffer：1 セル 1 バイトの記号が stride 間隔で並んだバッファ
+    - 2 次元のバッファ（NumPy 配列など）：形と stride はバッファから取る
+    - 1 次元のバッファ（bytes, bytearray, memoryview, mmap）：改行で区切ったテキストとして読む
+
+    バッファと文字列・bytes の行は，記号から種類への変換表でまとめて変換する（Python のオブジェクトを作らない）．
+    """
+    if isinstance(maze_list, GridMap):
+        return maze_list
+    if isinstance(maze_list, (list, tuple)):
+        grid = _compile_rows(maze_list, start_symbol, goal_symbol, load_symbol)
+    else:
+        if not isinstance(maze_list, MazeBuffer):
+            maze_list = _as_maze_buffer(maze_list)
+        grid = _compile_buffer(maze_list, code_table(start_symbol, goal_symbol, load_symbol))
+    grid.find_endpoints()
+    return grid
+
+
+def code_table(start_symbol, goal_symbol, load_symbol):
+    # 記号の 1 バイト -> セルの種類の変換表（bytes.translate 用）
+    table = bytearray(256)  # WALL
+    for symbol, code in ((load_symbol, ROAD), (goal_symbol, GOAL), (start_symbol, START)):
+        table[symbol_byte(symbol)] = code
+    return bytes(table)
+
+
+def row_codes(row, table, codes):
+    # 1 行分の記号をセルの種類の bytes にする．文字列・bytes の行は変換表でまとめて変換し，
+    # それ以外（色名のリストなど）や table が None のときは codes を 1 つずつ引く
+    if table is not None and isinstance(row, (str, bytes, bytearray, memoryview)):
+        if isinstance(row, str):
+            # latin-1 に入らない文字は "?" になるが，記号ではないのでどちらも壁になる
+            row = row.encode("latin-1", "replace")
+        return bytes(row).translate(table) if isinstance(row, memoryview) else row.translate(table)
+    return bytes(codes.get(item, WALL) for item in row)
+
+
+def _compile_rows(maze_list, start_symbol, goal_symbol, load_symbol):
+    grid = GridMap(len(maze_list), len(maze_list[0]))
+    codes = {load_symbol: ROAD, goal_symbol: GOAL, start_symbol: START}
+    try:
+        table = code_table(start_symbol, goal_symbol, load_symbol)
+    except ValueError:
+        table = None  # 色名のように 1 文字でない記号は 1 つずつ引く
+    for y, row in enumerate(maze_list):
+        if len(row) != grid.cols:
+            raise ValueError("迷路の各行の長さがそろっていません")
+        head = grid.cell_id(y, 0)
+        grid.cells[head:head + grid.cols] = row_codes(row, table, codes)
+    return grid
+
+
+def _as_maze_buffer(buffer):
+    view = memoryview(buffer)
+    if view.ndim == 1 and view.itemsize == 1 and view.format != "B":
+        view = view.cast("B")
+    if view.ndim == 2:
+        if view.itemsize != 1:
+            raise ValueError("地図のバッファは 1 セル 1 バイトにしてください")
+        rows, cols = view.shape
+        return MazeBuffer(buffer, rows, cols, view.strides[0])
+    if view.ndim != 1 or view.itemsize != 1:
+        raise ValueError("地図のバッファは 1 セル 1 バイトにしてください")
+
+    # 改行で区切ったテキスト（最後の改行はあってもなくてもよい）
+    newline = _find_byte(view, ord("\n"))
+    if newline == -1:
+        return MazeBuffer(buffer, 1, len(view))
+    cols = newline - 1 if newline and view[newline - 1] == ord("\r") else newline
+    stride = newline + 1
+    rows = (len(view) + stride - cols) // stride
+    if len(view) not in (rows * stride, rows * stride - stride + cols):
+        raise ValueError("迷路の各行の長さがそろっていません")
+    return MazeBuffer(buffer, rows, cols, stride)
+
+
+def _find_byte(view, value):
+    # 大きなバッファ（mmap など）も少しずつ読んで探す
+    needle = bytes([value])
+    for start in range(0, len(view), BUFFER_BLOCK_BYTES):
+        found = view[start:start + BUFFER_BLOCK_BYTES].tobytes().find(needle)
+        if found != -1:
+            return start + found
+    return -1
+
+
+def _compile_buffer(maze, table):
+    view = memoryview(maze.buffer)
+    if view.ndim != 1:
+        if view.c_contiguous:
+            view = view.cast("B")
+        else:
+            # 行の間に隙間のある 2 次元の配列は 1 次元にできないので，詰めた複製を読む
+            view = memoryview(view.tobytes())
+            maze = MazeBuffer(view, maze.rows, maze.cols)
+    elif view.format != "B":
+        view = view.cast("B")
+    rows, cols, stride = maze.rows, maze.cols, maze.stride
+    if maze.offset + (rows - 1) * stride + cols > len(view):
+        raise ValueError("地図のバッファが行数と列数に足りません")
+
+    # 何行かずつまとめて変換表を通し，各行を外周の壁の内側に写す
+    grid = GridMap(rows, cols)
+    block_rows = max(1, BUFFER_BLOCK_BYTES // stride)
+    for y0 in range(0, rows, block_rows):
+        y1 = min(rows, y0 + block_rows)
+        start = maze.offset + y0 * stride
+        block = memoryview(view[start:start + (y1 - y0 - 1) * stride + cols].tobytes().translate(table))
+        for y in range(y0, y1):
+            head = grid.cell_id(y, 0)
+            grid.cells[head:head + cols] = block[(y - y0) * stride:(y - y0) * stride + cols]
+    return grid
+
+
+def render_maze(grid, start_symbol="@", goal_symbol="*", load_symbol=".", wall_symbol="#"):
+    # GridMap を記号のリストに戻す（表示用．compile_maze の逆）
+    symbols = (wall_symbol, load_symbol, start_symbol, goal_symbol)
+    maze = []
+    for y in range(grid.rows):
+        head = grid.cell_id(y, 0)
+        maze.append([symbols[code] for code in grid.cells[head:head + grid.cols]])
+    return maze
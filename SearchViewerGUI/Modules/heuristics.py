@@ -0,0 +1,96 @@
+import math
+from array import array
+from collections import OrderedDict
+try:
+    import numpy as np
+except ImportError:  # NumPy がなければ Python のループで作る
+    np = None
+
+SQRT2 = math.sqrt(2)
+
+
+# 縦横の差（dy, dx は 0 以上）からの推定距離
+def euclidean(dy, dx):
+    return math.sqrt(dy * dy + dx * dx)
+
+def manhattan(dy, dx):
+    return dy + dx
+
+def octile(dy, dx):
+    return max(dy, dx) + (SQRT2 - 1) * min(dy, dx)
+
+def chebyshev(dy, dx):
+    return max(dy, dx)
+
+
+HEURISTICS = {
+    "euclidean": euclidean,
+    "manhattan": manhattan,
+    "octile": octile,
+    "chebyshev": chebyshev,
+}
+
+
+def get_heuristic(name):
+    if name not in HEURISTICS:
+        raise ValueError(f"未対応のヒューリスティックです: {name}（{', '.join(HEURISTICS)} から選択）")
+    return HEURISTICS[name]
+
+
+FIELD_CACHE_BYTES = 64 * 1024 * 1024  # heuristic_field のキャッシュの上限（1 セル 8 バイト）
+_field_cache = OrderedDict()  # (name, goal_position, rows, cols) -> array("d")
+_field_cache_bytes = 0
+
+
+def heuristic_field(name, goal_position, rows, cols):
+    """ゴールまでの推定距離を GridMap のセル番号順（外周の壁を含む）に並べた配列．
+
+    ゴール位置と地図の形ごとに合計 FIELD_CACHE_BYTES までキャッシュするので，同じ条件の探索では一度しか計算しない．
+    1 つで上限を超える大きな地図の表は残さず，受け取った Searcher と一緒に解放される．
+    """
+    global _field_cache_bytes
+    get_heuristic(name)
+    key = (name, goal_position, rows, cols)
+    field = _field_cache.get(key)
+    if field is not None:
+        _field_cache.move_to_end(key)
+        return field
+
+    field = _build_field(name, goal_position, rows, cols)
+    size = len(field) * field.itemsize
+    if size <= FIELD_CACHE_BYTES:
+        _field_cache[key] = field
+        _field_cache_bytes += size
+        while _field_cache_bytes > FIELD_CACHE_BYTES:
+            _, old = _field_cache.popitem(last=False)
+            _field_cache_bytes -= len(old) * old.itemsize
+    return field
+
+
+def clear_field_cache():
+    global _field_cache_bytes
+    _field_cache.clear()
+    _field_cache_bytes = 0
+
+
+def _build_field(name, goal_position, rows, cols):
+    goal_y, goal_x = goal_position
+    if np is None:
+        function = HEURISTICS[name]
+        return array("d", (function(abs(y - goal_y), abs(x - goal_x))
+                           for y in range(-1, rows + 1) for x in range(-1, cols + 1)))
+
+    dy = np.abs(np.arange(-1, rows + 1, dtype=np.float64) - goal_y)[:, None]
+    dx = np.abs(np.arange(-1, cols + 1, dtype=np.float64) - goal_x)[None, :]
+    if name == "euclidean":
+        field = np.sqrt(dy * dy + dx * dx)
+    elif name == "manhattan":
+        field = dy + dx
+    elif name == "octile":
+        field = np.maximum(dy, dx) + (SQRT2 - 1) * np.minimum(dy, dx)
+    else:
+        field = np.maximum(dy, dx)
+    # 探索中は 1 要素ずつ読むので，Python の float を直接返す array に移す
+    values = array("d")
+    values.frombytes(np.ascontiguousarray(field, dtype=np.float64).tobytes())
+    return values
@@ -0,0 +1,189 @@
+from array import array
+try:
+    from .iddfs_module import Searcher as IDDFSSearcher  # 相対インポート
+    from .structure import NodeList
+    from .cell_index import cell_buffer
+    from .grid_map import PASSABLE
+    from .heuristics import get_heuristic, heuristic_field
+    from .search_events import EXPAND, ITERATION, FINISH
+except ImportError:
+    from iddfs_module import Searcher as IDDFSSearcher  # 絶対インポート
+    from structure import NodeList
+    from cell_index import cell_buffer
+    from grid_map import PASSABLE
+    from heuristics import get_heuristic, heuristic_field
+    from search_events import EXPAND, ITERATION, FINISH
+
+class Searcher(IDDFSSearcher):
+    """IDDFS の深さ制限の代わりに f = g + h のしきい値で打ち切る IDA*．
+
+    ヒューリスティックは a_star_module と同じものを使う．
+    探索中に持つのは現在の経路だけなので，record=False にするとメモリは経路長に比例する量で済む．
+    """
+
+    def __init__(self, maze_list, passed_cost=0.5,
+                 start_symbol="@", goal_symbol="*",
+                 load_symbol=".", wall_symbol="#", route_symbol="■",
+                 explored_symbol="□", heuristic="euclidean",
+                 precompute_heuristic=False, record=True):
+        super().__init__(maze_list, passed_cost, start_symbol, goal_symbol,
+                         load_symbol, wall_symbol, route_symbol, explored_symbol, record)
+        self.heuristic = get_heuristic(heuristic)  # euclidean, manhattan, octile, chebyshev
+        # 各反復のしきい値: [threshold, ...]（depth_list_2_records のキーと同じ順）
+        self.thresholds = []
+
+        self.h_field = None
+        if precompute_heuristic and self.goal_position:
+            self.h_field = heuristic_field(heuristic, tuple(self.goal_position), *self.maze_size)
+
+    def _h(self, cell):
+        if self.h_field is not None:
+            return self.h_field[cell]
+        y, x = self.grid.position(cell)
+        return self.heuristic(abs(y - self.goal_position[0]), abs(x - self.goal_position[1]))
+
+    def search(self, max_iterations=None, debug=False):
+        for _ in self._search(max_iterations, debug, events=False):
+            pass
+        return self.goal_flag
+
+    def search_iter(self, max_iterations=None, debug=False):
+        # 探索の途中経過を (種類, 値) のイベントとして順に返す
+        return self._search(max_iterations, debug, events=True)
+
+    def _search(self, max_iterations, debug, events):
+        # events が False ならイベントを作らない（search() はこれを最後まで回すだけ）
+        if self.start_position is None or self.goal_position is None:
+            raise ValueError("スタート地点またはゴール地点が見つかりません")
+
+        self.goal_flag = False
+        self.goal_cell = self.grid.goal_cell
+        on_path = cell_buffer(len(self.grid))
+        threshold = self._h(self.grid.start_cell)
+        iteration = 0
+        while max_iterations is None or iteration < max_iterations:
+            if debug:
+                print(f"しきい値: {threshold}")
+            if events:
+                yield (ITERATION, threshold)
+            # 初期化
+            self.list_2 = array("i")
+            self.goal_node = -1
+            found, next_threshold = yield from self._threshold_search(on_path, threshold, debug, events)
+
+            # 探索済みノードを記録（キーは反復回数）
+            self.thresholds.append(threshold)
+            if self.record:
+                self.depth_list_2_records[iteration] = NodeList(self.store, self.list_2)
+
+            if found:
+                self.goal_flag = True
+                if debug:
+                    print(f"目標に到達: しきい値 {threshold} で発見")
+                    self.print_maze(label="経路")
+                self._reconstruct_path()
+                break
+
+            if next_threshold is None:
+                # しきい値で打ち切ったノードがなければ探索し尽くしている
+                if debug:
+                    print("探索失敗")
+                break
+            threshold = next_threshold
+            iteration += 1
+        if events:
+            yield (FINISH, self.goal_flag)
+
+    def _threshold_search(self, on_path, threshold, debug, events):
+        # 訪れたセルを EXPAND として返すジェネレータ．戻り値は（ゴール発見, 次のしきい値 = 打ち切ったノードの f の最小値）
+        start = self.grid.start_cell
+        root = -1
+        if self.record:
+            root = self.store.add(start, -1, 0.0, self._h(start))
+            self.list_2.append(root)
+        self.expanded_count += 1
+        if events:
+            yield (EXPAND, self.start_position)
+        if debug:
+            print(f"探索ノード: {self.grid.position(start)} f: {self._h(start)}")
+        if start == self.goal_cell:
+            self.goal_node = root
+            self.path_cells = [start]
+            return True, None
+
+        # スタックにはセル番号と次に調べる方向を積む（スタックの高さ - 1 = 深さ）
+        cell_stack = [start]
+        dir_stack = [0]
+        node_stack = [root]
+        on_path[start] = 1
+        next_threshold = None
+        n_dir = len(self.offsets)
+
+        while cell_stack:
+            i = dir_stack[-1]
+            if i == n_dir:
+                # 全方向を調べ終えたら戻る
+                on_path[cell_stack.pop()] = 0
+                dir_stack.pop()
+                node_stack.pop()
+                continue
+            dir_stack[-1] = i + 1
+
+            coord = cell_stack[-1] + self.offsets[i]
+            # 外周は壁なので範囲チェックは不要
+            if self.grid.cells[coord] & PASSABLE and not on_path[coord]:
+                g = len(cell_stack) * self.passed_cost
+                h = self._h(coord)
+                if g + h > threshold:
+                    if next_threshold is None or g + h < next_threshold:
+                        next_threshold = g + h
+                    continue
+
+                child = -1
+                if self.record:
+                    child = self.store.add(coord, node_stack[-1], g, h)
+                    self.list_2.append(child)
+                self.expanded_count += 1
+                if events:
+                    yield (EXPAND, self.grid.position(coord))
+                if debug:
+                    print(f"探索ノード: {self.grid.position(coord)} f: {g + h}")
+
+                if coord == self.goal_cell:
+                    self.goal_node = child
+                    self.path_cells = cell_stack + [coord]
+                    for cell in cell_stack:
+                        on_path[cell] = 0
+                    return True, next_threshold
+
+                on_path[coord] = 1
+                cell_stack.append(coord)
+                dir_stack.append(0)
+                node_stack.append(child)
+
+        return False, next_threshold
+
+    def get_thresholds(self):
+        return self.thresholds
+
+if __name__ == "__main__":
+    maze_list = [
+        ["."]*5 for _ in range(10)
+    ]
+    maze_list[1][1] = "@"
+    maze_list[3][3] = "*"
+    maze_list[2][2] = "#"
+    maze_list[2][3] = "#"
+    searcher = Searcher(maze_list, passed_cost=1.0)
+    found = searcher.search(debug=False)
+    print("found:", found)
+    print("goal_flag:", searcher.get_goal_flag())
+    print("path:", searcher.get_results_path())
+    for iteration, rec in searcher.get_depth_list_2_records().items():
+        print(f"Threshold {searcher.get_thresholds()[iteration]:.2f}: {[n.getTarget() for n in rec]}")
+
+    # スタートとゴールが同じセルなら，根を展開した時点で経路 1 セルで見つかる
+    searcher = Searcher(searcher.grid.with_endpoints([1, 1], [1, 1]))
+    searcher.search(max_iterations=3)
+    print("start == goal:", searcher.get_goal_flag(), searcher.get_results_path(),
+          searcher.get_path_cost(), searcher.get_expanded_count())
@@ -1,14 +1,22 @@
-import copy
+from array import array
 try:
-    from .structure import Structure as St  # 相対インポート
+    from .structure import NodeStore, NodeList  # 相対インポート
+    from .cell_index import cell_buffer
+    from .grid_map import compile_maze, render_maze, PASSABLE
+    from .search_events import EXPAND, ITERATION, FINISH
+    from .search_result import SearchResult
 except ImportError:
-    from structure import Structure as St  # 絶対インポート
+    from structure import NodeStore, NodeList  # 絶対インポート
+    from cell_index import cell_buffer
+    from grid_map import compile_maze, render_maze, PASSABLE
+    from search_events import EXPAND, ITERATION, FINISH
+    from search_result import SearchResult
 
 class Searcher:
     def __init__(self, maze_list, passed_cost=0.5,
                  start_symbol="@", goal_symbol="*",
                  load_symbol=".", wall_symbol="#", route_symbol="■",
-                 explored_symbol="□"):
+                 explored_symbol="□", record=True):
         self.original_maze = maze_list
         self.start_symbol = start_symbol
         self.goal_symbol = goal_symbol
@@ -17,44 +25,60 @@ class Searcher:
         self.route_symbol = route_symbol
         self.explored_symbol = explored_symbol
         self.passed_cost = passed_cost
+        self.record = record  # False なら反復ごとの探索済みノードを残さない
 
-        self.maze_size = (len(maze_list), len(maze_list[0]))
         # 優先方向: 右, 下, 左, 上
         self.idx_list = [[0, 1], [1, 0], [0, -1], [-1, 0]]
 
-        self.start_position = self._find_symbol(start_symbol)
-        self.goal_position = self._find_symbol(goal_symbol)
-        self.goal_node = None
+        # 1 セル 1 バイトに変換した地図と，探索順に並べた隣接セルのオフセット表
+        self.grid = compile_maze(maze_list, start_symbol, goal_symbol, load_symbol)
+        self.maze_size = [self.grid.rows, self.grid.cols]
+        self.offsets = self.grid.neighbor_offsets(self.idx_list)
+
+        self.start_position = self.grid.get_start_position()
+        self.goal_position = self.grid.get_goal_position()
+        self.goal_node = -1
         self.goal_flag = False
-        # 各深さごとの探索済みノード記録: {limit: [Structure, ...]}
+        # 各深さごとの探索済みノード記録: {limit: NodeList}
         self.depth_list_2_records = {}
         self.results_path = []
-
-    def _find_symbol(self, symbol):
-        return next(([i, j] for i, row in enumerate(self.original_maze)
-                     for j, item in enumerate(row) if item == symbol), None)
+        self.path_cells = []  # ゴール発見時の探索経路（セル番号）
+        self.expanded_count = 0  # 全反復で訪れたノードの合計
+        # ノード情報（全深さ制限分をまとめて保持，距離には深さを入れる）
+        self.store = NodeStore(self.grid)
 
     def search(self, max_depth = 10, debug=False):
+        for _ in self._search(max_depth, debug, events=False):
+            pass
+        return self.goal_flag
+
+    def search_iter(self, max_depth=10, debug=False):
+        # 探索の途中経過を (種類, 値) のイベントとして順に返す
+        return self._search(max_depth, debug, events=True)
+
+    def _search(self, max_depth, debug, events):
+        # events が False ならイベントを作らない（search() はこれを最後まで回すだけ）
         if self.start_position is None or self.goal_position is None:
             raise ValueError("スタート地点またはゴール地点が見つかりません")
 
         self.goal_flag = False
+        self.goal_cell = self.grid.goal_cell
+        # 現在の探索経路上にあるセル（再帰版の visited と同じ役割）
+        on_path = cell_buffer(len(self.grid))
         for limit in range(max_depth + 1):
             if debug:
                 print(f"深さ制限: {limit}")
+            if events:
+                yield (ITERATION, limit)
             # 初期化
-            self.list_2 = []
-            self.goal_node = None
-            # DFS を再帰で実行
-            visited = set()
-            root = St()
-            root.setTarget(self.start_position)
-            root.setDistance(0)
-            visited.add(tuple(self.start_position))
-            found = self._depth_limited_search(root, visited, 0, limit, debug)
+            self.list_2 = array("i")
+            self.goal_node = -1
+            # DFS を明示的なスタックで実行（再帰の深さ制限を受けない）
+            found, cutoff = yield from self._depth_limited_search(on_path, limit, debug, events)
 
             # 探索済みノードを記録
-            self.depth_list_2_records[limit] = list(self.list_2)
+            if self.record:
+                self.depth_list_2_records[limit] = NodeList(self.store, self.list_2)
 
             if found:
                 self.goal_flag = True
@@ -62,42 +86,93 @@ class Searcher:
                     print(f"目標に到達: 深さ {limit} で発見")
                     self.print_maze(label="経路")
                 self._reconstruct_path()
-                return True
-        return False
+                break
 
-    def _depth_limited_search(self, node, visited, depth, limit, debug):
-        # ノード訪問を記録
-        self.list_2.append(node)
+            if not cutoff:
+                # 深さ制限に一度も達していなければ，制限を増やしても同じ探索になるのでここで終える．
+                # ゴールに届く場合は打ち切りがあるので，各深さ制限はこれまでどおりスタートから探索し直す．
+                # 残りの深さ制限の記録には，探索し直した場合と同じになるこの反復の記録を入れる
+                if debug:
+                    print(f"深さ {limit} で探索し尽くしたため終了")
+                if self.record:
+                    for rest in range(limit + 1, max_depth + 1):
+                        self.depth_list_2_records[rest] = self.depth_list_2_records[limit]
+                break
+        if events:
+            yield (FINISH, self.goal_flag)
+
+    def _depth_limited_search(self, on_path, limit, debug, events):
+        # 訪れたセルを EXPAND として返すジェネレータ．戻り値は（ゴール発見, 深さ制限で打ち切ったノードがあったか）
+        start = self.grid.start_cell
+        root = -1
+        if self.record:
+            root = self.store.add(start)
+            self.list_2.append(root)
+        self.expanded_count += 1
+        if events:
+            yield (EXPAND, self.start_position)
         if debug:
-            print(f"探索ノード: {node.getTarget()} 深さ: {depth}")
-
-        if node.getTarget() == self.goal_position:
-            self.goal_node = node
-            return True
-
-        if depth >= limit:
-            return False
-
-        # 子ノード展開
-        y, x = node.getTarget()
-        for dy, dx in self.idx_list:
-            ny, nx = y + dy, x + dx
-            if 0 <= ny < self.maze_size[0] and 0 <= nx < self.maze_size[1]:
-                if self.original_maze[ny][nx] in (self.load_symbol, self.goal_symbol):
-                    coord = (ny, nx)
-                    if coord not in visited:
-                        child = St()
-                        child.setTarget([ny, nx])
-                        child.setBeforeTarget(node.getTarget())
-                        child.setDistance(depth + 1)
-                        visited.add(coord)
-                        if self._depth_limited_search(child, visited, depth + 1, limit, debug):
-                            return True
-                        visited.remove(coord)
-        return False
+            print(f"探索ノード: {self.grid.position(start)} 深さ: 0")
+        if start == self.goal_cell:
+            self.goal_node = root
+            self.path_cells = [start]
+            return True, False
+        if limit == 0:
+            return False, True
+
+        # スタックにはセル番号と次に調べる方向を積む（スタックの高さ - 1 = 深さ）．
+        # ノード番号は記録するときだけ作る
+        cell_stack = [start]
+        dir_stack = [0]
+        node_stack = [root]
+        on_path[start] = 1
+        cutoff = False
+        n_dir = len(self.offsets)
+
+        while cell_stack:
+            i = dir_stack[-1]
+            if i == n_dir:
+                # 全方向を調べ終えたら戻る
+                on_path[cell_stack.pop()] = 0
+                dir_stack.pop()
+                node_stack.pop()
+                continue
+            dir_stack[-1] = i + 1
+
+            coord = cell_stack[-1] + self.offsets[i]
+            # 外周は壁なので範囲チェックは不要
+            if self.grid.cells[coord] & PASSABLE and not on_path[coord]:
+                depth = len(cell_stack)
+                child = -1
+                if self.record:
+                    child = self.store.add(coord, node_stack[-1], 0.0, depth)
+                    self.list_2.append(child)
+                self.expanded_count += 1
+                if events:
+                    yield (EXPAND, self.grid.position(coord))
+                if debug:
+                    print(f"探索ノード: {self.grid.position(coord)} 深さ: {depth}")
+
+                if coord == self.goal_cell:
+                    self.goal_node = child
+                    self.path_cells = cell_stack + [coord]
+                    for cell in cell_stack:
+                        on_path[cell] = 0
+                    return True, cutoff
+
+                if depth >= limit:
+                    cutoff = True
+                    continue
+
+                on_path[coord] = 1
+                cell_stack.append(coord)
+                dir_stack.append(0)
+                node_stack.append(child)
+
+        return False, cutoff
 
     def _print_iteration_maze(self, limit):
-        display = copy.deepcopy(self.original_maze)
+        display = render_maze(self.grid, self.start_symbol, self.goal_symbol, self.load_symbol, self.wall_symbol)
         for node in self.depth_list_2_records[limit]:
             y, x = node.getTarget()
             if display[y][x] == self.load_symbol:
@@ -108,21 +183,13 @@ class Searcher:
         print()
 
     def _reconstruct_path(self):
-        self.results_path = []
-        node = self.goal_node
-        while node:
-            y, x = node.getTarget()
-            self.original_maze[y][x] = self.route_symbol
-            self.results_path.append([y, x])
-            if node.getTarget() == self.start_position:
-                break
-            prev = node.getBeforeTarget()
-            node = next((n for n in self.depth_list_2_records[node.getDistance() - 1] 
-                         if n.getTarget() == prev), None)
-        self.results_path.reverse()
+        # ゴール発見時のスタックがそのまま経路になる
+        self.results_path = [self.grid.position(cell) for cell in self.path_cells]
 
     def print_maze(self, maze=None, label="地図"):
-        maze = maze or self.original_maze
+        if maze is None:
+            maze = self.get_result().to_symbols(self.start_symbol, self.goal_symbol, self.load_symbol,
+                                                self.wall_symbol, self.route_symbol)
         print(label + ":")
         for row in maze:
             print([item for item in row])
@@ -130,6 +197,15 @@ class Searcher:
     def get_results_path(self):
         return self.results_path
 
+    def get_result(self):
+        return SearchResult(self.grid, self.results_path, self.goal_flag, self.get_path_cost(), self.expanded_count)
+
+    def get_path_cost(self):
+        return (len(self.results_path) - 1) * self.passed_cost if self.results_path else None
+
+    def get_expanded_count(self):
+        return self.expanded_count
+
     # 誰か実装して
     # def get_depth_list_1_records(self):
     #     return self.depth_list_1_records
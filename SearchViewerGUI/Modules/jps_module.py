@@ -0,0 +1,296 @@
+import heapq
+from array import array
+try:
+    from .structure import NodeStore, NodeList  # 相対インポート
+    from .cell_index import CellIndex, cell_table
+    from .grid_map import compile_maze, WALL
+    from .heuristics import get_heuristic, heuristic_field
+    from .search_events import GENERATE, EXPAND, FINISH
+    from .search_result import SearchResult
+except ImportError:
+    from structure import NodeStore, NodeList  # 絶対インポート
+    from cell_index import CellIndex, cell_table
+    from grid_map import compile_maze, WALL
+    from heuristics import get_heuristic, heuristic_field
+    from search_events import GENERATE, EXPAND, FINISH
+    from search_result import SearchResult
+
+class Searcher:
+    """上下左右移動・一様コストの地図向けの Jump Point Search．
+
+    直線上に進める限り跳び，曲がる必要が出る点（ジャンプポイント）だけを A* で展開する．
+    順序付けは歩数 + 推定距離で行うので，passed_cost に関係なく最短経路を返す．
+    """
+
+    def __init__(self, maze_list, passed_cost=0.5,
+             start_symbol="@", goal_symbol="*",
+             load_symbol=".", wall_symbol="#", route_symbol="■",
+             heuristic="euclidean", precompute_heuristic=False, record=True):
+
+        # 引数で渡された設定値
+        self.maze_list = maze_list
+        self.cost = passed_cost
+        self.start_symbol = start_symbol
+        self.goal_symbol = goal_symbol
+        self.load_symbol = load_symbol
+        self.wall_symbol = wall_symbol
+        self.route_symbol = route_symbol
+        self.heuristic = get_heuristic(heuristic)  # euclidean, manhattan, octile, chebyshev
+        self.record = record  # False なら表示用の記録（list_1_record, list_2）を作らない
+
+        # 構造と位置関係（展開順は a_star_module と同じ：上，右，下，左）
+        self.idx_list = [[-1, 0], [0, 1], [1, 0], [0, -1]]
+        self.grid = compile_maze(maze_list, start_symbol, goal_symbol, load_symbol)
+        self.maze_size = [self.grid.rows, self.grid.cols]
+        self.offsets = self.grid.neighbor_offsets(self.idx_list)
+
+        # 状態管理用
+        self.list_1 = []  # オープンリスト（(f, ノード番号, 歩数) の二分ヒープ）
+        self.list_2 = array("i")
+        self.goal_flag = False
+        self.results_path = []
+        self.expanded_count = 0
+
+        # セル番号ごとの L1/L2 所属表とノード表，ノード情報（g には歩数 × passed_cost を入れる）
+        self.index = CellIndex(len(self.grid))
+        self.node_table = cell_table(len(self.grid))  # CellIndex が NEW でないセルだけを引く
+        self.steps = {}  # ノード番号 -> スタートからの歩数
+        self.store = NodeStore(self.grid)
+
+        self.list_1_record = []  # 各展開ごとに見つかったジャンプポイントの記録
+
+        # スタート／ゴール地点
+        self.start_position = self.grid.get_start_position()
+        self.goal_position = self.grid.get_goal_position()
+
+        self.h_field = None
+        if precompute_heuristic and self.goal_position:
+            self.h_field = heuristic_field(heuristic, tuple(self.goal_position), *self.maze_size)
+
+    def _h(self, cell):
+        if self.h_field is not None:
+            return self.h_field[cell]
+        y, x = self.grid.position(cell)
+        return self.heuristic(abs(y - self.goal_position[0]), abs(x - self.goal_position[1]))
+
+    def _open(self, cell):
+        # スタートも通過できるセルとして扱う（外周は壁）
+        return self.grid.cells[cell] != WALL
+
+    def _jump_horizontal(self, cell, d):
+        # 横方向（d = ±1）に跳び，ジャンプポイントのセル番号を返す（なければ -1）
+        stride = self.grid.stride
+        while True:
+            if not self._open(cell):
+                return -1
+            if cell == self.grid.goal_cell:
+                return cell
+            # 1 つ手前では上下がふさがっていて，ここで開いている（強制隣接）
+            if (self._open(cell - stride) and not self._open(cell - stride - d)) or \
+               (self._open(cell + stride) and not self._open(cell + stride - d)):
+                return cell
+            cell += d
+
+    def _jump_vertical(self, cell, d):
+        # 縦方向（d = ±行幅）に跳び，ジャンプポイントのセル番号を返す（なければ -1）
+        while True:
+            if not self._open(cell):
+                return -1
+            if cell == self.grid.goal_cell:
+                return cell
+            if (self._open(cell - 1) and not self._open(cell - 1 - d)) or \
+               (self._open(cell + 1) and not self._open(cell + 1 - d)):
+                return cell
+            # 横に跳んでジャンプポイントがあれば，ここで曲がる必要がある
+            if self._jump_horizontal(cell + 1, 1) != -1 or self._jump_horizontal(cell - 1, -1) != -1:
+                return cell
+            cell += d
+
+    def _directions(self, node):
+        # 親からの進行方向で枝刈りした探索方向（スタートは全方向）
+        parent = self.store.parent[node]
+        if parent == -1:
+            return self.offsets
+        cell = self.store.cell[node]
+        stride = self.grid.stride
+        if abs(cell - self.store.cell[parent]) < stride:
+            d = 1 if cell > self.store.cell[parent] else -1
+            return [offset for offset in self.offsets if offset in (d, -stride, stride)]
+        d = stride if cell > self.store.cell[parent] else -stride
+        return [offset for offset in self.offsets if offset in (d, -1, 1)]
+
+    def _push(self, node):
+        steps = self.steps[node]
+        heapq.heappush(self.list_1, (steps + self.store.h[node], node, steps))
+
+    def _discard_stale(self):
+        # 歩数の更新で古くなったエントリを先頭から取り除く（遅延削除）
+        while self.list_1 and self.list_1[0][2] != self.steps[self.list_1[0][1]]:
+            heapq.heappop(self.list_1)
+
+    def _open_nodes(self):
+        return [node for _, node, steps in sorted(self.list_1) if steps == self.steps[node]]
+
+    def search(self, debug=False):
+        for _ in self._search(debug, events=False):
+            pass
+
+    def search_iter(self, debug=False):
+        # 探索の途中経過を (種類, 値) のイベントとして順に返す
+        return self._search(debug, events=True)
+
+    def _search(self, debug, events):
+        # events が False ならイベントを作らない（search() はこれを最後まで回すだけ）
+        if not self.start_position or not self.goal_position:
+            raise ValueError("スタート地点またはゴール地点が見つかりません")
+
+        goal_cell = self.grid.goal_cell
+        start_key = self.grid.start_cell
+        start_node = self.store.add(start_key, -1, 0.0, self._h(start_key))
+        self.steps[start_node] = 0
+        self.index.set_open(start_key)
+        self.node_table[start_key] = start_node
+        self._push(start_node)
+        if self.record:
+            self.list_1_record.append([self.start_position])
+        if events:
+            yield (GENERATE, self.start_position)
+        goal_node = -1
+        track = self.record or events  # 座標を作る必要があるか
+
+        while True:
+            self._discard_stale()
+            if len(self.list_1) == 0:
+                if debug:
+                    print("探索失敗")
+                break
+
+            if debug:
+                print(f"探索リスト: {[self.store.position(i) for i in self._open_nodes()]}")
+
+            tmp_u = heapq.heappop(self.list_1)[1]
+            if self.record:
+                self.list_2.append(tmp_u)
+            self.expanded_count += 1
+            u_key = self.store.cell[tmp_u]
+            self.index.set_closed(u_key)
+            if events:
+                yield (EXPAND, self.grid.position(u_key))
+
+            if u_key == goal_cell:
+                self.goal_flag = True
+                goal_node = tmp_u
+                if debug:
+                    print("探索成功")
+                break
+
+            temp_list_1 = []
+
+            for d in self._directions(tmp_u):
+                if abs(d) == 1:
+                    key = self._jump_horizontal(u_key + d, d)
+                else:
+                    key = self._jump_vertical(u_key + d, d)
+                if key == -1 or self.index.is_closed(key):
+                    continue
+
+                # ジャンプは直線なので，歩数はセル番号の差から求まる
+                distance = abs(key - u_key)
+                if distance >= self.grid.stride:
+                    distance //= self.grid.stride
+                new_steps = self.steps[tmp_u] + distance
+
+                if self.index.is_new(key):
+                    tmp_v = self.store.add(key, tmp_u, new_steps * self.cost, self._h(key))
+                    self.steps[tmp_v] = new_steps
+                    self.node_table[key] = tmp_v
+                    self.index.set_open(key)
+                    self._push(tmp_v)
+
+                    if track:
+                        position = self.grid.position(key)
+                        if self.record:
+                            temp_list_1.append(position)
+                        if events:
+                            yield (GENERATE, position)
+
+                elif new_steps < self.steps[self.node_table[key]]:
+                    existing_open = self.node_table[key]
+                    self.steps[existing_open] = new_steps
+                    self.store.g[existing_open] = new_steps * self.cost
+                    self.store.parent[existing_open] = tmp_u
+                    self._push(existing_open)
+
+            if self.record:
+                if debug:
+                    print(f"ジャンプポイント: {temp_list_1}")
+                self.list_1_record.append(temp_list_1)
+
+        if self.goal_flag:
+            # ジャンプポイントの間を直線で埋めて 1 マスずつの経路にする
+            jump_points = self.store.path_to(goal_node)
+            self.results_path = [jump_points[0]]
+            for y, x in jump_points[1:]:
+                prev_y, prev_x = self.results_path[-1]
+                step_y = (y > prev_y) - (y < prev_y)
+                step_x = (x > prev_x) - (x < prev_x)
+                while [prev_y, prev_x] != [y, x]:
+                    prev_y += step_y
+                    prev_x += step_x
+                    self.results_path.append([prev_y, prev_x])
+        if events:
+            yield (FINISH, self.goal_flag)
+
+    def print_maze(self, maze=None, label="地図"):
+        if maze is None:
+            maze = self.get_result().to_symbols(self.start_symbol, self.goal_symbol, self.load_symbol,
+                                                self.wall_symbol, self.route_symbol)
+        print(label + ":")
+        for row in maze:
+            print([item for item in row])
+
+    def get_results_path(self):
+        return self.results_path
+
+    def get_result(self):
+        return SearchResult(self.grid, self.results_path, self.goal_flag, self.get_path_cost(), self.expanded_count)
+
+    def get_path_cost(self):
+        return (len(self.results_path) - 1) * self.cost if self.results_path else None
+
+    def get_expanded_count(self):
+        return self.expanded_count
+
+    def get_list_1(self):
+        return NodeList(self.store, self._open_nodes())
+
+    def get_list_2(self):
+        return NodeList(self.store, self.list_2)
+
+    def get_list_1_records(self):
+        return self.list_1_record
+
+    def get_goal_flag(self):
+        return self.goal_flag
+
+    def get_start_position(self):
+        return self.start_position
+
+    def get_goal_position(self):
+        return self.goal_position
+
+if __name__ == "__main__":
+    maze_list = [
+        ["@",".",".",".","."],
+        [".",".",".",".","."],
+        [".",".",".","#","."],
+        [".",".","#","#","."],
+        [".",".",".",".","*"],
+    ]
+
+    searcher = Searcher(maze_list)
+    searcher.search(debug=True)
+    print(f"list_2: {[i.getTarget() for i in searcher.get_list_2()]}")
+    print(f"list_1_records: {searcher.get_list_1_records()}")
+    print(f"経路長: {len(searcher.get_results_path())}")
+    searcher.print_maze(label="経路")
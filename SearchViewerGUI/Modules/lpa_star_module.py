@@ -0,0 +1,283 @@
+import heapq
+import math
+from array import array
+try:
+    from .structure import NodeStore, NodeList  # 相対インポート
+    from .grid_map import GridMap, compile_maze, WALL, ROAD, START, GOAL
+    from .heuristics import get_heuristic
+    from .search_events import GENERATE, EXPAND, FINISH
+    from .search_result import SearchResult
+except ImportError:
+    from structure import NodeStore, NodeList  # 絶対インポート
+    from grid_map import GridMap, compile_maze, WALL, ROAD, START, GOAL
+    from heuristics import get_heuristic
+    from search_events import GENERATE, EXPAND, FINISH
+    from search_result import SearchResult
+
+INF = math.inf
+
+class Searcher:
+    """壁の変更後に，影響を受けた部分だけを直して経路を引き直す LPA*（Lifelong Planning A*）．
+
+    search() を呼ぶたびに前回の探索結果（g / rhs とオープンリスト）を引き継ぐ．
+    update_cell() でセルを書き換えてから search() を呼ぶと，変化したセルの周りだけを展開し直す．
+    スタートやゴールを動かしたときは最初から探索し直す．
+    距離は歩数で持つので，passed_cost に関係なく最短経路を返す（コストは歩数 × passed_cost）．
+    """
+
+    def __init__(self, maze_list, passed_cost=0.5,
+             start_symbol="@", goal_symbol="*",
+             load_symbol=".", wall_symbol="#", route_symbol="■",
+             heuristic="euclidean", record=True):
+
+        # 引数で渡された設定値
+        self.maze_list = maze_list
+        self.cost = passed_cost
+        self.start_symbol = start_symbol
+        self.goal_symbol = goal_symbol
+        self.load_symbol = load_symbol
+        self.wall_symbol = wall_symbol
+        self.route_symbol = route_symbol
+        self.heuristic = get_heuristic(heuristic)  # euclidean, manhattan, octile, chebyshev
+        self.record = record  # False なら表示用の記録（list_1_record, list_2）を作らない
+        self.track = record  # オープンリストに入ったセルの座標を集めるか（search_iter 中はイベントにも使う）
+
+        # 構造と位置関係（展開順は a_star_module と同じ：上，右，下，左）
+        self.idx_list = [[-1, 0], [0, 1], [1, 0], [0, -1]]
+        if isinstance(maze_list, GridMap):
+            # update_cell には記号の代わりにセルの種類を渡す．地図は書き換えるので複製して持つ
+            self.codes = {ROAD: ROAD, GOAL: GOAL, START: START}
+            self.grid = maze_list.copy()
+        else:
+            self.codes = {load_symbol: ROAD, goal_symbol: GOAL, start_symbol: START}
+            self.grid = compile_maze(maze_list, start_symbol, goal_symbol, load_symbol)
+        self.maze_size = [self.grid.rows, self.grid.cols]
+        self.offsets = self.grid.neighbor_offsets(self.idx_list)
+
+        self.goal_flag = False
+        self.results_path = []
+        self.expanded_count = 0  # 直前の search() で展開したセルの数
+        self._reset()
+
+    def _reset(self):
+        # スタート／ゴール地点
+        self.start_position = self.grid.get_start_position()
+        self.goal_position = self.grid.get_goal_position()
+        self.needs_reset = False
+
+        # セル番号ごとの歩数の推定値 g と，隣接セルから見た一段先読みの値 rhs
+        self.g = array("d", [INF]) * len(self.grid)
+        self.rhs = array("d", [INF]) * len(self.grid)
+        # オープンリスト（(k1, k2, セル番号) の二分ヒープ）と，オープンなセルの有効なキー
+        self.list_1 = []
+        self.open_keys = {}
+
+        self.generated = []  # 次の展開記録に入れる，オープンリストに入ったセル
+        if self.start_position and self.goal_position:
+            self.rhs[self.grid.start_cell] = 0.0
+            self._update_vertex(self.grid.start_cell)
+
+    def _h(self, cell):
+        y, x = self.grid.position(cell)
+        return self.heuristic(abs(y - self.goal_position[0]), abs(x - self.goal_position[1]))
+
+    def _key(self, cell):
+        m = min(self.g[cell], self.rhs[cell])
+        return (m + self._h(cell), m)
+
+    def _update_vertex(self, cell):
+        cells = self.grid.cells
+        if cell != self.grid.start_cell:
+            rhs = INF
+            if cells[cell] != WALL:
+                for offset in self.offsets:
+                    # スタートも通過できるセルとして扱う（外周は壁）
+                    if cells[cell + offset] != WALL and self.g[cell + offset] + 1 < rhs:
+                        rhs = self.g[cell + offset] + 1
+            self.rhs[cell] = rhs
+
+        if self.g[cell] != self.rhs[cell]:
+            key = self._key(cell)
+            if self.open_keys.get(cell) != key:
+                self.open_keys[cell] = key
+                heapq.heappush(self.list_1, (key[0], key[1], cell))
+                if self.track:
+                    self.generated.append(self.grid.position(cell))
+        elif cell in self.open_keys:
+            # ヒープからは取り出し時に捨てる（遅延削除）
+            del self.open_keys[cell]
+
+    def _discard_stale(self):
+        while self.list_1:
+            k1, k2, cell = self.list_1[0]
+            if self.open_keys.get(cell) == (k1, k2):
+                break
+            heapq.heappop(self.list_1)
+
+    def update_cell(self, y, x, symbol):
+        # 自分の地図のセルを書き換え（maze_list はそのまま），次の search() で直す必要のあるセルをオープンリストに入れる
+        cell = self.grid.cell_id(y, x)
+        code = self.codes.get(symbol, WALL)
+        old_code = self.grid.cells[cell]
+        if code == old_code:
+            return
+        self.grid.cells[cell] = code
+        if self.needs_reset or code in (START, GOAL) or old_code in (START, GOAL):
+            self.needs_reset = True
+            return
+
+        self._update_vertex(cell)
+        for offset in self.offsets:
+            if self.grid.cells[cell + offset] != WALL:
+                self._update_vertex(cell + offset)
+
+    def search(self, debug=False):
+        for _ in self._search(debug, events=False):
+            pass
+
+    def search_iter(self, debug=False):
+        # 探索の途中経過を (種類, 値) のイベントとして順に返す
+        return self._search(debug, events=True)
+
+    def _search(self, debug, events):
+        # events が False ならイベントを作らない（search() はこれを最後まで回すだけ）
+        if self.needs_reset:
+            # update_cell でスタートかゴールを動かしたので，地図から探し直す
+            self.grid.find_endpoints()
+            self._reset()
+        if not self.start_position or not self.goal_position:
+            raise ValueError("スタート地点またはゴール地点が見つかりません")
+
+        self.store = NodeStore(self.grid)
+        self.list_2 = array("i")
+        self.list_1_record = [self.generated] if self.record else []  # 各展開ごとのL1リスト記録
+        self.expanded_count = 0
+        if events:
+            # 記録しないときは探索前に集めていないので，いまオープンなセルを返す
+            opened = self.generated if self.record else [self.grid.position(c) for c in self.open_keys]
+            for position in opened:
+                yield (GENERATE, position)
+        self.track = self.record or events
+
+        goal_cell = self.grid.goal_cell
+        while True:
+            self._discard_stale()
+            if not self.list_1:
+                break
+            top = self.list_1[0][:2]
+            if top >= self._key(goal_cell) and self.rhs[goal_cell] == self.g[goal_cell]:
+                break
+
+            u = heapq.heappop(self.list_1)[2]
+            del self.open_keys[u]
+            self.generated = []
+            self.expanded_count += 1
+            if events:
+                yield (EXPAND, self.grid.position(u))
+
+            if self.g[u] > self.rhs[u]:
+                # 過大評価だった：確定させて隣接セルに伝える
+                self.g[u] = self.rhs[u]
+            else:
+                # 過小評価だった（壁が増えた）：いったん無限大に戻して自分も直し直す
+                self.g[u] = INF
+                self._update_vertex(u)
+            for offset in self.offsets:
+                if self.grid.cells[u + offset] != WALL:
+                    self._update_vertex(u + offset)
+
+            if self.record:
+                self.list_2.append(self.store.add(u, -1, self.g[u] * self.cost, self._h(u)))
+                self.list_1_record.append(self.generated)
+            if events:
+                for position in self.generated:
+                    yield (GENERATE, position)
+            if debug:
+                print(f"展開: {self.grid.position(u)} g: {self.g[u]} 追加: {self.generated}")
+
+        self.generated = []
+        self.track = self.record
+        self.goal_flag = self.g[goal_cell] != INF
+        self.results_path = []
+        if not self.goal_flag:
+            if debug:
+                print("探索失敗")
+            if events:
+                yield (FINISH, False)
+            return
+
+        # ゴールから g が 1 ずつ小さくなる隣接セルをたどる
+        cell = goal_cell
+        path = [cell]
+        while cell != self.grid.start_cell:
+            cell = min((cell + offset for offset in self.offsets
+                        if self.grid.cells[cell + offset] != WALL),
+                       key=lambda c: self.g[c])
+            path.append(cell)
+        path.reverse()
+        self.results_path = [self.grid.position(cell) for cell in path]
+        if debug:
+            print(f"探索成功: 展開 {self.expanded_count} ノード")
+        if events:
+            yield (FINISH, True)
+
+    def print_maze(self, maze=None, label="地図"):
+        if maze is None:
+            maze = self.get_result().to_symbols(self.start_symbol, self.goal_symbol, self.load_symbol,
+                                                self.wall_symbol, self.route_symbol)
+        print(label + ":")
+        for row in maze:
+            print([item for item in row])
+
+    def get_results_path(self):
+        return self.results_path
+
+    def get_result(self):
+        return SearchResult(self.grid, self.results_path, self.goal_flag, self.get_path_cost(), self.expanded_count)
+
+    def get_path_cost(self):
+        return (len(self.results_path) - 1) * self.cost if self.results_path else None
+
+    def get_expanded_count(self):
+        return self.expanded_count
+
+    def get_list_1(self):
+        # オープンなセルは展開記録とは別の NodeStore に並べる
+        store = NodeStore(self.grid)
+        return NodeList(store, [store.add(cell, -1, self.g[cell] * self.cost, self._h(cell))
+                                for cell in sorted(self.open_keys, key=self.open_keys.get)])
+
+    def get_list_2(self):
+        return NodeList(self.store, self.list_2)
+
+    def get_list_1_records(self):
+        return self.list_1_record
+
+    def get_goal_flag(self):
+        return self.goal_flag
+
+    def get_start_position(self):
+        return self.start_position
+
+    def get_goal_position(self):
+        return self.goal_position
+
+if __name__ == "__main__":
+    maze_list = [
+        ["@",".",".",".","."],
+        [".",".",".",".","."],
+        [".",".",".","#","."],
+        [".",".","#","#","."],
+        [".",".",".",".","*"],
+    ]
+
+    searcher = Searcher(maze_list)
+    searcher.search()
+    print(f"最初の探索: 展開 {len(searcher.get_list_2())} ノード, 経路長 {len(searcher.get_results_path())}")
+    searcher.print_maze(label="経路")
+
+    # 経路上に壁を置いて引き直す
+    searcher.update_cell(1, 4, "#")
+    searcher.search()
+    print(f"再探索: 展開 {len(searcher.get_list_2())} ノード, 経路長 {len(searcher.get_results_path())}")
+    searcher.print_maze(label="経路")
@@ -0,0 +1,239 @@
+import mmap
+import os
+import struct
+try:
+    from .grid_map import GridMap, compile_maze, code_table, row_codes, ROAD, START, GOAL  # 相対インポート
+except ImportError:
+    from grid_map import GridMap, compile_maze, code_table, row_codes, ROAD, START, GOAL  # 絶対インポート
+
+# 地図ファイル：先頭にヘッダ，DATA_OFFSET から外周の壁を含めたセルの種類（1 セル 1 バイト）が並ぶ
+MAGIC = b"SVMAP\r\n\x1a"
+VERSION = 1
+# 先頭からの並び：MAGIC, バージョン, レイアウト, 行数, 列数, タイルの大きさ, スタートとゴールのセル番号, セルの位置
+HEADER = struct.Struct("<8sHHIIIqqQ")
+DATA_OFFSET = 1 << 16  # mmap の offset に使えるように，どの OS の割り当て単位よりも大きい 2 のべき乗にそろえる
+
+# セルの並べ方
+LINEAR = 0  # GridMap.cells と同じ行優先．開くと mmap をそのまま GridMap のセルにする
+TILED = 1  # tile_size 四方のタイルごとにまとめる．狭い範囲の探索は，その範囲のタイルのページだけを読む
+DEFAULT_TILE_SIZE = 64  # 64 x 64 = 4 KiB（1 ページ）
+
+
+class TiledCells:
+    """タイル順に並んだセルの種類を，GridMap のセル番号（外周の壁を含めた行優先）で読むための包み．
+
+    rows, cols は外周の壁を含めない大きさ．読むだけで書き換えはできない．
+    """
+
+    def __init__(self, data, rows, cols, tile_size):
+        self.data = data
+        self.stride = cols + 2
+        self.length = (rows + 2) * self.stride
+        self.shift = tile_size.bit_length() - 1
+        self.mask = tile_size - 1
+        self.tiles_x = -(-self.stride // tile_size)
+
+    def __len__(self):
+        return self.length
+
+    def _offset(self, y, x):
+        # 外周の壁を含めた (y, x) のデータ上の位置：(タイル番号 * T + タイル内の行) * T + タイル内の列
+        shift = self.shift
+        tile = (y >> shift) * self.tiles_x + (x >> shift)
+        return (((tile << shift) | (y & self.mask)) << shift) | (x & self.mask)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._read(*key.indices(self.length))
+        if not 0 <= key < self.length:
+            raise IndexError("セル番号が地図の範囲外です")
+        y, x = divmod(key, self.stride)
+        return self.data[self._offset(y, x)]
+
+    def _read(self, start, stop, step):
+        # 行優先の範囲を，1 つのタイルの 1 行に収まる区間ごとに読んでつなぐ
+        if step != 1:
+            return bytes(self[i] for i in range(start, stop, step))
+        parts = []
+        while start < stop:
+            y, x = divmod(start, self.stride)
+            run = min(stop - start, self.stride - x, self.mask + 1 - (x & self.mask))
+            head = self._offset(y, x)
+            parts.append(self.data[head:head + run])
+            start += run
+        return b"".join(parts)
+
+    def find(self, sub):
+        # 何行かずつ読んで探す（find_endpoints 用．行の区切りをまたぐ sub は見つけない）
+        block = max(1, (1 << 20) // self.stride) * self.stride
+        for start in range(0, self.length, block):
+            found = self[start:start + block].find(sub)
+            if found != -1:
+                return start + found
+        return -1
+
+
+class MapWriter:
+    """地図ファイルを 1 行ずつ書く．地図全体をメモリに持たないので，巨大な地図もテキストなどから変換できる．
+
+        with MapWriter(path, rows, cols) as writer:
+            for row in rows_of_symbols:
+                writer.write_row(row)
+
+    行は compile_maze の行と同じもの（記号のリスト，文字列，bytes）．スタート／ゴールは最初に見つかったもの．
+    """
+
+    def __init__(self, path, rows, cols, layout=LINEAR, tile_size=DEFAULT_TILE_SIZE,
+                 start_symbol="@", goal_symbol="*", load_symbol="."):
+        if layout not in (LINEAR, TILED):
+            raise ValueError("地図ファイルのレイアウトは LINEAR か TILED にしてください")
+        if tile_size < 1 or tile_size & (tile_size - 1):
+            raise ValueError("タイルの大きさは 2 のべき乗にしてください")
+        if rows < 1 or cols < 1:
+            raise ValueError("地図の行数と列数は 1 以上にしてください")
+        self.rows = rows
+        self.cols = cols
+        self.stride = cols + 2
+        self.layout = layout
+        self.tile_size = tile_size if layout == TILED else 0
+        self.codes = {load_symbol: ROAD, goal_symbol: GOAL, start_symbol: START}
+        try:
+            self.table = code_table(start_symbol, goal_symbol, load_symbol)
+        except ValueError:
+            self.table = None  # 色名のように 1 文字でない記号は 1 つずつ引く
+        self.start_cell = -1
+        self.goal_cell = -1
+        self.written = 0  # 書いた行数（外周の壁を除く）
+        self.band = []  # TILED で，タイル 1 段分たまるまで待っている行
+
+        self.file = open(path, "wb")
+        self.file.seek(DATA_OFFSET)  # ヘッダは最後にスタート／ゴールが決まってから書く
+        self._put(bytes(self.stride))  # 上の外周の壁
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+
+    def write_row(self, row):
+        if self.written == self.rows:
+            raise ValueError("地図ファイルに rows より多くの行を書こうとしました")
+        codes = row_codes(row, self.table, self.codes)
+        if len(codes) != self.cols:
+            raise ValueError("迷路の各行の長さがそろっていません")
+        head = (self.written + 1) * self.stride + 1
+        if self.start_cell == -1 and START in codes:
+            self.start_cell = head + codes.index(START)
+        if self.goal_cell == -1 and GOAL in codes:
+            self.goal_cell = head + codes.index(GOAL)
+        self.written += 1
+        self._put(b"\0" + codes + b"\0")
+
+    def _put(self, padded_row):
+        if self.layout == LINEAR:
+            self.file.write(padded_row)
+            return
+        self.band.append(padded_row)
+        if len(self.band) == self.tile_size:
+            self._flush_band()
+
+    def _flush_band(self):
+        # たまった行を，横に並んだタイルごとに書き出す（タイルに足りない行と列は壁で埋める）
+        tile = self.tile_size
+        width = -(-self.stride // tile) * tile
+        rows = [row.ljust(width, b"\0") for row in self.band]
+        rows.extend([bytes(width)] * (tile - len(rows)))
+        for x in range(0, width, tile):
+            self.file.write(b"".join(row[x:x + tile] for row in rows))
+        self.band = []
+
+    def close(self):
+        if self.file.closed:
+            return
+        try:
+            if self.written != self.rows:
+                raise ValueError("地図ファイルに書いた行数が rows と合いません")
+            self._put(bytes(self.stride))  # 下の外周の壁
+            if self.band:
+                self._flush_band()
+            self.file.seek(0)
+            self.file.write(HEADER.pack(MAGIC, VERSION, self.layout, self.rows, self.cols, self.tile_size,
+                                        self.start_cell, self.goal_cell, DATA_OFFSET))
+        finally:
+            self.file.close()
+
+
+def save_map(path, maze_list, layout=LINEAR, tile_size=DEFAULT_TILE_SIZE,
+             start_symbol="@", goal_symbol="*", load_symbol="."):
+    # compile_maze が受け取れる地図（GridMap なら記号の指定は不要）を地図ファイルに書く
+    grid = compile_maze(maze_list, start_symbol, goal_symbol, load_symbol)
+    with MapWriter(path, grid.rows, grid.cols, layout, tile_size, START, GOAL, ROAD) as writer:
+        for y in range(grid.rows):
+            head = grid.cell_id(y, 0)
+            writer.write_row(grid.cells[head:head + grid.cols])
+        # GUI の地図のように，スタート／ゴールの位置が決まっていればそのまま使う
+        writer.start_cell = grid.start_cell
+        writer.goal_cell = grid.goal_cell
+
+
+def open_map(path):
+    """地図ファイルを mmap で開いて GridMap を返す．セルはファイルから読まずに，触ったページだけが読み込まれる．
+
+    地図は読み取り専用なので，そのまま Searcher に渡せる（LPA* は自分用に複製する）．
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) != HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError("地図ファイルではありません")
+        (_, version, layout, rows, cols, tile_size,
+         start_cell, goal_cell, data_offset) = HEADER.unpack(header)
+        if version != VERSION:
+            raise ValueError(f"地図ファイルのバージョン {version} には対応していません")
+        if layout == LINEAR:
+            size = (rows + 2) * (cols + 2)
+        elif layout == TILED:
+            size = -(-(rows + 2) // tile_size) * -(-(cols + 2) // tile_size) * tile_size * tile_size
+        else:
+            raise ValueError(f"地図ファイルのレイアウト {layout} には対応していません")
+        if os.fstat(f.fileno()).st_size < data_offset + size:
+            raise ValueError("地図ファイルが途中で切れています")
+        data = mmap.mmap(f.fileno(), size, offset=data_offset, access=mmap.ACCESS_READ)
+
+    grid = GridMap(rows, cols, data if layout == LINEAR else TiledCells(data, rows, cols, tile_size))
+    grid.start_cell = start_cell
+    grid.goal_cell = goal_cell
+    return grid
+
+
+if __name__ == "__main__":
+    import tempfile
+    try:
+        from . import a_star_module  # 相対インポート
+    except ImportError:
+        import a_star_module  # 絶対インポート
+
+    maze_list = [
+        "@....",
+        ".....",
+        "...#.",
+        "..##.",
+        "....*",
+    ]
+
+    expected = a_star_module.Searcher(maze_list)
+    expected.search()
+    with tempfile.TemporaryDirectory() as directory:
+        for name, layout in (("LINEAR", LINEAR), ("TILED", TILED)):
+            path = os.path.join(directory, name.lower() + ".svmap")
+            save_map(path, maze_list, layout, tile_size=4)
+            grid = open_map(path)
+            searcher = a_star_module.Searcher(grid)
+            searcher.search()
+            same = searcher.get_results_path() == expected.get_results_path()
+            print(f"{name}: ファイル {os.path.getsize(path)} バイト, 経路長 {len(searcher.get_results_path())}, "
+                  f"メモリ上の地図と同じ経路: {same}")
+            searcher.print_maze(label="経路")
@@ -0,0 +1,269 @@
+import os
+try:
+    from .grid_map import GridMap, compile_maze, code_table, symbol_byte, WALL, ROAD, START, GOAL  # 相対インポート
+    from .map_file import MapWriter, LINEAR, DEFAULT_TILE_SIZE
+except ImportError:
+    from grid_map import GridMap, compile_maze, code_table, symbol_byte, WALL, ROAD, START, GOAL  # 絶対インポート
+    from map_file import MapWriter, LINEAR, DEFAULT_TILE_SIZE
+
+# 地図のテキスト形式
+MOVINGAI = "movingai"  # MovingAI のベンチマークの .map（type / height / width / map の見出しのあとに地図の行が続く）
+SYMBOLS = "symbols"  # このリポジトリの記号（@ スタート，* ゴール，. 道，# 壁）の行だけを並べたテキスト
+
+# MovingAI の地形：. G（平地）と S（沼）は通れる．@ O（範囲外），T（木），W（水）は壁
+MOVINGAI_TABLE = bytes(ROAD if chr(byte) in ".GS" else WALL for byte in range(256))
+# セルの種類 -> MovingAI の地形（WALL, ROAD, START, GOAL の順．スタート／ゴールは平地として書く）
+MOVINGAI_SYMBOLS = b"@..."
+
+READ_BLOCK_BYTES = 1 << 20  # 地図のテキストを一度に読む量（この量の行をまとめて読んでから 1 行ずつ変換する）
+
+
+def guess_format(path):
+    # 拡張子が .map なら MovingAI の地図，それ以外は記号の行だけのテキストとみなす
+    return MOVINGAI if os.path.splitext(path)[1].lower() == ".map" else SYMBOLS
+
+
+class MapTextReader:
+    """地図のテキストファイルを，1 行ずつセルの種類の bytes（外周の壁を含めない cols バイト）にして返す．
+
+    行は READ_BLOCK_BYTES ずつまとめて読み，各行を変換表で一度に変換する．地図全体は読み込まない．
+    format が None なら拡張子から決める（guess_format）．記号は SYMBOLS の地図を読むときだけ使う．
+    """
+
+    def __init__(self, path, format=None, start_symbol="@", goal_symbol="*", load_symbol="."):
+        self.format = guess_format(path) if format is None else format
+        if self.format == MOVINGAI:
+            self.table = MOVINGAI_TABLE
+        elif self.format == SYMBOLS:
+            self.table = code_table(start_symbol, goal_symbol, load_symbol)
+        else:
+            raise ValueError(f"地図の形式 {format} には対応していません")
+        self.file = open(path, "rb")
+        try:
+            self.rows, self.cols = self._read_header() if self.format == MOVINGAI else self._count_rows()
+        except BaseException:
+            self.file.close()
+            raise
+        if self.rows < 1 or self.cols < 1:
+            self.file.close()
+            raise ValueError("地図が空です")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def _read_header(self):
+        # "map" の行までの見出しから大きさを読む（type は octile 以外でも地図の行の読み方は同じ）
+        fields = {}
+        while True:
+            line = self.file.readline()
+            if not line:
+                raise ValueError("MovingAI の地図に map の行がありません")
+            line = line.strip()
+            if line.lower() == b"map":
+                break
+            key, _, value = line.partition(b" ")
+            fields[key.lower()] = value.strip()
+        try:
+            return int(fields[b"height"]), int(fields[b"width"])
+        except (KeyError, ValueError):
+            raise ValueError("MovingAI の地図の見出しに height と width がありません") from None
+
+    def _count_rows(self):
+        # 見出しがないので，最初の行の長さを列数とし，改行を数えて行数を出す（最後の改行はあってもなくてもよい）
+        cols = len(self.file.readline().rstrip(b"\r\n"))
+        self.file.seek(0)
+        rows = 0
+        last = b"\n"
+        while True:
+            block = self.file.read(READ_BLOCK_BYTES)
+            if not block:
+                break
+            rows += block.count(b"\n")
+            last = block[-1:]
+        if last != b"\n":
+            rows += 1
+        self.file.seek(0)
+        return rows, cols
+
+    def __iter__(self):
+        remaining = self.rows
+        while remaining:
+            lines = self.file.readlines(READ_BLOCK_BYTES)
+            if not lines:
+                raise ValueError("地図の行数が見出しより少なくなっています")
+            for line in lines[:remaining]:
+                row = line.rstrip(b"\r\n").translate(self.table)
+                if len(row) != self.cols:
+                    raise ValueError("迷路の各行の長さがそろっていません")
+                yield row
+            remaining -= min(len(lines), remaining)
+
+
+def read_map(path, format=None, start_symbol="@", goal_symbol="*", load_symbol="."):
+    """地図のテキストファイルを GridMap にする．そのまま Searcher や GUI に渡せる．
+
+    MovingAI の地図にはスタート／ゴールがないので，with_endpoints かシナリオ（run_scenarios）で決める．
+    """
+    with MapTextReader(path, format, start_symbol, goal_symbol, load_symbol) as reader:
+        grid = GridMap(reader.rows, reader.cols)
+        for y, row in enumerate(reader):
+            head = grid.cell_id(y, 0)
+            grid.cells[head:head + grid.cols] = row
+    grid.find_endpoints()
+    return grid
+
+
+def convert_map(source, path, layout=LINEAR, tile_size=DEFAULT_TILE_SIZE, format=None,
+                start_symbol="@", goal_symbol="*", load_symbol="."):
+    # 地図のテキストファイルを地図ファイル（map_file.open_map で開く）に 1 行ずつ流して書く．巨大な地図もメモリに載せない
+    with MapTextReader(source, format, start_symbol, goal_symbol, load_symbol) as reader:
+        with MapWriter(path, reader.rows, reader.cols, layout, tile_size, START, GOAL, ROAD) as writer:
+            for row in reader:
+                writer.write_row(row)
+
+
+def write_map(path, maze_list, format=None, start_symbol="@", goal_symbol="*", load_symbol=".", wall_symbol="#"):
+    # compile_maze が受け取れる地図（GridMap なら記号の指定は不要）を 1 行ずつテキストに書く
+    format = guess_format(path) if format is None else format
+    if format == MOVINGAI:
+        symbols = MOVINGAI_SYMBOLS
+    elif format == SYMBOLS:
+        symbols = bytes(symbol_byte(symbol) for symbol in (wall_symbol, load_symbol, start_symbol, goal_symbol))
+    else:
+        raise ValueError(f"地図の形式 {format} には対応していません")
+    table = symbols + symbols[:1] * (256 - len(symbols))  # セルの種類 -> 記号（種類にない値は壁）
+    grid = compile_maze(maze_list, start_symbol, goal_symbol, load_symbol)
+
+    with open(path, "wb") as f:
+        if format == MOVINGAI:
+            f.write(f"type octile\nheight {grid.rows}\nwidth {grid.cols}\nmap\n".encode("ascii"))
+        for y in range(grid.rows):
+            head = grid.cell_id(y, 0)
+            line = bytearray(grid.cells[head:head + grid.cols].translate(table))
+            # セル番号だけで決めたスタート／ゴール（with_endpoints）も記号で書く
+            for cell, code in ((grid.start_cell, START), (grid.goal_cell, GOAL)):
+                if head <= cell < head + grid.cols:
+                    line[cell - head] = symbols[code]
+            line += b"\n"
+            f.write(line)
+
+
+class Scenario:
+    """MovingAI の .scen の 1 行．start / goal は [y, x]（ファイルでは x, y の順）．
+
+    optimal_length はベンチマークが 8 方向移動（斜めは √2）で求めた最短距離なので，
+    上下左右にしか進まない Searcher の経路長とは一致しない．
+    """
+
+    def __init__(self, start, goal, map_name="", width=0, height=0, bucket=0, optimal_length=0.0):
+        self.start = start
+        self.goal = goal
+        self.map_name = map_name
+        self.width = width
+        self.height = height
+        self.bucket = bucket
+        self.optimal_length = optimal_length
+
+    def __repr__(self):
+        return f"Scenario(start={self.start}, goal={self.goal}, map_name={self.map_name!r})"
+
+
+def read_scenarios(path):
+    # .scen を 1 行ずつ読んで Scenario を順に返す（先頭の "version" の行と空行は飛ばす）
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            fields = line.rstrip("\r\n").split("\t") if "\t" in line else line.split()
+            if len(fields) < 9:
+                if fields and fields[0].lower() != "version":
+                    raise ValueError(f"シナリオの {number} 行目を読めません")
+                continue
+            try:
+                bucket, width, height, start_x, start_y, goal_x, goal_y = (
+                    int(fields[i]) for i in (0, 2, 3, 4, 5, 6, 7))
+                optimal_length = float(fields[8])
+            except ValueError:
+                raise ValueError(f"シナリオの {number} 行目を読めません") from None
+            yield Scenario([start_y, start_x], [goal_y, goal_x], fields[1], width, height, bucket, optimal_length)
+
+
+def write_scenarios(path, scenarios):
+    # Scenario の並びを .scen（version 1）に書く
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write("version 1\n")
+        for s in scenarios:
+            f.write(f"{s.bucket}\t{s.map_name}\t{s.width}\t{s.height}\t{s.start[1]}\t{s.start[0]}\t"
+                    f"{s.goal[1]}\t{s.goal[0]}\t{s.optimal_length:.8f}\n")
+
+
+def find_scenario_map(scenario_path, map_name):
+    # .scen の map 列（ベンチマークのディレクトリ構成を含むことがある）から地図ファイルを探す
+    directory = os.path.dirname(scenario_path)
+    for candidate in (os.path.join(directory, map_name), os.path.join(directory, os.path.basename(map_name)), map_name):
+        if os.path.isfile(candidate):
+            return candidate
+    raise FileNotFoundError(f"シナリオの地図 {map_name} が見つかりません")
+
+
+def run_scenarios(module, grid, scenarios, **options):
+    """シナリオのスタート／ゴールごとに module.Searcher で探索し，(Scenario, SearchResult) を順に返す．
+
+    地図は 1 つの GridMap を複製せずに共有し，with_endpoints でスタート／ゴールだけを決め直す．
+    options は Searcher にそのまま渡す（record=False にすると表示用の記録を作らない）．
+    """
+    if grid.start_cell != -1 or grid.goal_cell != -1:
+        # 地図に描かれたスタート／ゴールのセルも，ほかのシナリオでは通れる道にする
+        grid = grid.copy()
+        for cell in (grid.start_cell, grid.goal_cell):
+            if cell != -1:
+                grid.cells[cell] = ROAD
+    for scenario in scenarios:
+        if scenario.width and (scenario.height, scenario.width) != (grid.rows, grid.cols):
+            raise ValueError("シナリオの地図の大きさが地図と合いません")
+        searcher = module.Searcher(grid.with_endpoints(scenario.start, scenario.goal), **options)
+        searcher.search()
+        yield scenario, searcher.get_result()
+
+
+if __name__ == "__main__":
+    import tempfile
+    try:
+        from . import a_star_module  # 相対インポート
+    except ImportError:
+        import a_star_module  # 絶対インポート
+
+    movingai_map = (
+        "type octile\n"
+        "height 5\n"
+        "width 6\n"
+        "map\n"
+        "......\n"
+        ".@@T..\n"
+        "...T.G\n"
+        ".WWW..\n"
+        "S.....\n"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        map_path = os.path.join(directory, "demo.map")
+        scen_path = os.path.join(directory, "demo.map.scen")
+        with open(map_path, "w") as f:
+            f.write(movingai_map)
+        write_scenarios(scen_path, [Scenario([0, 0], [2, 5], "demo.map", 6, 5),
+                                    Scenario([4, 0], [0, 5], "demo.map", 6, 5),
+                                    Scenario([2, 0], [2, 4], "demo.map", 6, 5)])
+
+        grid = read_map(map_path)
+        for scenario, result in run_scenarios(a_star_module, grid, read_scenarios(scen_path), record=False):
+            print(f"{scenario.start} -> {scenario.goal}: 到達 {result.goal_flag}, "
+                  f"経路長 {len(result.path)}, 展開 {result.expanded_count}")
+
+        # このリポジトリの記号で書き出す（スタート／ゴールは最初のシナリオのもの）
+        text_path = os.path.join(directory, "demo.txt")
+        write_map(text_path, grid.with_endpoints([0, 0], [2, 5]))
+        with open(text_path) as f:
+            print(f.read(), end="")
@@ -0,0 +1,111 @@
+import sys
+from collections import OrderedDict
+try:
+    from .search_events import (GENERATE, EXPAND, GENERATE_BACKWARD, EXPAND_BACKWARD,  # 相対インポート
+                                ITERATION, FINISH)
+except ImportError:
+    from search_events import (GENERATE, EXPAND, GENERATE_BACKWARD, EXPAND_BACKWARD,  # 絶対インポート
+                               ITERATION, FINISH)
+
+_MASK = (1 << 64) - 1
+# [y, x] 1 個あたりのおおよそのメモリ量（リスト本体．小さい整数は共有されるので数えない）
+_POSITION_BYTES = sys.getsizeof([0, 0])
+
+
+def zobrist_key(index, kind):
+    """セル番号 index に種類 kind（0 は空白）が置かれたときの 64 ビットの乱数．
+
+    表を持たずに splitmix64 で毎回作るので，大きなグリッドでもメモリを使わない．
+    空白は 0 なので，空白だけのグリッドのハッシュ値は 0 になる．
+    """
+    if kind == 0:
+        return 0
+    z = (index * 4 + kind + 0x9E3779B97F4A7C15) & _MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+    return z ^ (z >> 31)
+
+
+class SearchTrace:
+    # 探索 1 回分の経路とアニメーション用の記録（座標だけを持ち，Searcher は参照しない）
+    __slots__ = ("list_1_records", "list_2", "list_2_sides", "depth_records",
+                 "results_path", "goal_flag")
+
+    def __init__(self, list_1_records=None, list_2=None, list_2_sides=None,
+                 depth_records=None, results_path=None, goal_flag=False):
+        self.list_1_records = list_1_records or []  # [[[y, x], ...], ...]
+        self.list_2 = list_2 or []  # [[y, x], ...]
+        self.list_2_sides = list_2_sides  # 双方向探索のときだけ（0: スタート側, 1: ゴール側）
+        self.depth_records = depth_records  # IDDFS / IDA* のときだけ: [(深さ, [[y, x], ...]), ...]
+        self.results_path = results_path or []
+        self.goal_flag = goal_flag
+
+    def add_events(self, events):
+        # search_iter() のイベントを順に記録へ足す（探索しながら少しずつ受け取るとき）．
+        # list_1_records[k] は k - 1 番目の展開で見つかったセルなので，展開のたびに次の記録を始める
+        for kind, value in events:
+            if kind == ITERATION:
+                if self.depth_records is None:
+                    self.depth_records = []
+                self.depth_records.append((value, []))
+            elif kind == FINISH:
+                self.goal_flag = value
+            elif self.depth_records is not None:
+                if kind == EXPAND:
+                    self.depth_records[-1][1].append(value)
+            elif kind in (EXPAND, EXPAND_BACKWARD):
+                if kind == EXPAND_BACKWARD and self.list_2_sides is None:
+                    self.list_2_sides = [0] * len(self.list_2)
+                if self.list_2_sides is not None:
+                    self.list_2_sides.append(int(kind == EXPAND_BACKWARD))
+                self.list_2.append(value)
+                self.list_1_records.append([])
+            elif kind in (GENERATE, GENERATE_BACKWARD):
+                if not self.list_1_records:
+                    self.list_1_records.append([])
+                self.list_1_records[-1].append(value)
+
+    def nbytes(self):
+        # キャッシュの追い出しに使う，おおよそのメモリ量
+        positions = len(self.list_2) + len(self.results_path)
+        positions += sum(len(record) for record in self.list_1_records)
+        if self.depth_records is not None:
+            positions += sum(len(list_2) for _, list_2 in self.depth_records)
+        size = positions * _POSITION_BYTES
+        if self.list_2_sides is not None:
+            size += len(self.list_2_sides) * 8
+        return size
+
+
+class ResultCache:
+    # 合計のメモリ量が max_bytes を超えたら，最も長く使われていないものから捨てる
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # キー -> (SearchTrace, バイト数)
+        self.total_bytes = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, trace):
+        size = trace.nbytes()
+        if size > self.max_bytes:
+            return  # 1 件で上限を超えるものは残さない
+        if key in self.entries:
+            self.total_bytes -= self.entries.pop(key)[1]
+        self.entries[key] = (trace, size)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, (_, old_size) = self.entries.popitem(last=False)
+            self.total_bytes -= old_size
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
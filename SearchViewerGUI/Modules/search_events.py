@@ -0,0 +1,7 @@
+# Searcher.search_iter() が順に返すイベント．どれも (種類, 値) のタプル
+GENERATE = "generate"  # 値は [y, x]．オープンリスト（L1）に入ったセル
+EXPAND = "expand"  # 値は [y, x]．展開した（L2 に入った）セル
+GENERATE_BACKWARD = "generate_backward"  # 双方向探索のゴール側の GENERATE
+EXPAND_BACKWARD = "expand_backward"  # 双方向探索のゴール側の EXPAND
+ITERATION = "iteration"  # 値は深さ制限（IDDFS）またはしきい値（IDA*）．反復の始まり
+FINISH = "finish"  # 値はゴールに到達したか．このときには経路ができている
@@ -0,0 +1,26 @@
+try:
+    from .grid_map import render_maze  # 相対インポート
+except ImportError:
+    from grid_map import render_maze  # 絶対インポート
+
+
+class SearchResult:
+    """1 回の探索の結果．Searcher は入力の地図を書き換えず，経路はここに入れて返す．
+
+    path はスタートからゴールまでの [y, x] のリスト（ゴールに届かなければ空）．
+    path_cost は経路のコスト（届かなければ None），expanded_count は展開したノードの数（数えない Searcher は None）．
+    """
+
+    def __init__(self, grid, path, goal_flag, path_cost=None, expanded_count=None):
+        self.grid = grid
+        self.path = path
+        self.goal_flag = goal_flag
+        self.path_cost = path_cost
+        self.expanded_count = expanded_count
+
+    def to_symbols(self, start_symbol="@", goal_symbol="*", load_symbol=".", wall_symbol="#", route_symbol="■"):
+        # 地図を記号のリストに戻し，経路のセルを route_symbol にする（表示用）
+        maze = render_maze(self.grid, start_symbol, goal_symbol, load_symbol, wall_symbol)
+        for y, x in self.path:
+            maze[y][x] = route_symbol
+        return maze
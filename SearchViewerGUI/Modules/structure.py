@@ -1,3 +1,5 @@
+from array import array
+
 class Structure:
 # constructor
     def __init__(self):
@@ -38,4 +40,90 @@ class Structure:
         self.cost = cost
     
     def getCost(self):
-        return self.cost
\ No newline at end of file
+        return self.cost
+
+
+class NodeStore:
+# constructor
+    # ノード情報を並列配列で保持する（ノード番号 = 各配列の添字）
+    def __init__(self, grid):
+        self.grid = grid  # セル番号と座標の変換に使う GridMap
+        self.cell = array("i")  # セル番号
+        self.parent = array("i")  # 親ノード番号（なければ -1）
+        self.g = array("d")  # コスト
+        self.h = array("d")  # 距離（ヒューリスティック値または深さ）
+
+    def __len__(self):
+        return len(self.cell)
+# node
+    def add(self, cell_id, parent_id=-1, g=0.0, h=0.0):
+        self.cell.append(cell_id)
+        self.parent.append(parent_id)
+        self.g.append(g)
+        self.h.append(h)
+        return len(self.cell) - 1
+
+    def position(self, node_id):
+        return self.grid.position(self.cell[node_id])
+
+    def view(self, node_id):
+        return NodeView(self, node_id)
+# path
+    def path_to(self, node_id):
+        # 親ノードをたどってスタートからの経路（[y, x] のリスト）を返す
+        path = []
+        while node_id != -1:
+            path.append(self.position(node_id))
+            node_id = self.parent[node_id]
+        path.reverse()
+        return path
+
+
+class NodeView:
+    # NodeStore の 1 ノードを Structure と同じメソッドで読み書きするビュー
+    __slots__ = ("store", "node_id")
+
+    def __init__(self, store, node_id):
+        self.store = store
+        self.node_id = node_id
+# prev
+    def getBeforeTarget(self):
+        parent_id = self.store.parent[self.node_id]
+        return [] if parent_id == -1 else self.store.position(parent_id)
+# target
+    def getTarget(self):
+        return self.store.position(self.node_id)
+# next
+    def getNextTarget(self):
+        return []
+# distance
+    def setDistance(self, distance):
+        self.store.h[self.node_id] = distance
+
+    def getDistance(self):
+        return self.store.h[self.node_id]
+# cost
+    def setCost(self, cost):
+        self.store.g[self.node_id] = cost
+
+    def getCost(self):
+        return self.store.g[self.node_id]
+
+
+class NodeList:
+    # ノード番号の列を NodeView の列として見せる（GUI 側は Structure のリストとして扱える）
+    def __init__(self, store, node_ids):
+        self.store = store
+        self.node_ids = node_ids
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.store.view(node_id) for node_id in self.node_ids[i]]
+        return self.store.view(self.node_ids[i])
+
+    def __iter__(self):
+        for node_id in self.node_ids:
+            yield self.store.view(node_id)
@@ -0,0 +1,197 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy がなくても他の Searcher は使えるようにする
+    np = None
+try:
+    from .grid_map import compile_maze, PASSABLE  # 相対インポート
+    from .search_events import GENERATE, EXPAND, FINISH
+    from .search_result import SearchResult
+except ImportError:
+    from grid_map import compile_maze, PASSABLE  # 絶対インポート
+    from search_events import GENERATE, EXPAND, FINISH
+    from search_result import SearchResult
+
+
+class Searcher:
+    """NumPy で 1 階層（同じ深さのノード群）ずつまとめて展開する BFS．
+
+    各階層の並びは bfs_module.Searcher のキューの並びと同じになるように作るので，
+    経路・ゴール判定・展開数は bfs_module と一致する．
+    """
+
+    def __init__(self, maze_list, passed_cost=0.5,
+             start_symbol="@", goal_symbol="*",
+             load_symbol=".", wall_symbol="#", route_symbol="■",
+             record=True):
+        if np is None:
+            raise ImportError("wavefront_bfs_module には NumPy が必要です（pip install numpy）")
+
+        # 引数で渡された設定値
+        self.maze_list = maze_list
+        self.cost = passed_cost
+        self.start_symbol = start_symbol
+        self.goal_symbol = goal_symbol
+        self.load_symbol = load_symbol
+        self.wall_symbol = wall_symbol
+        self.route_symbol = route_symbol
+        self.record = record  # False なら表示用の記録（level_records）を作らない
+
+        # 構造と位置関係（探索順は bfs_module と同じ：上，右，下，左）
+        self.idx_list = [[-1, 0], [0, 1], [1, 0], [0, -1]]
+        self.grid = compile_maze(maze_list, start_symbol, goal_symbol, load_symbol)
+        self.maze_size = [self.grid.rows, self.grid.cols]
+        self.offsets = np.array(self.grid.neighbor_offsets(self.idx_list), dtype=np.int64)
+
+        # 状態管理用
+        self.goal_flag = False
+        self.results_path = []
+        self.level_records = []  # 各階層のフロンティア（キュー順のセル番号）
+        self.expanded_count = 0
+
+        # スタート／ゴール地点
+        self.start_position = self.grid.get_start_position()
+        self.goal_position = self.grid.get_goal_position()
+
+    def search(self, debug=False):
+        for _ in self._search_levels(debug):
+            pass
+
+    def search_iter(self, debug=False):
+        # 探索の途中経過を (種類, 値) のイベントとして順に返す．
+        # 階層ごとの配列を 1 セルずつに分けるので，並びは bfs_module.search_iter と同じになる．
+        # ほかの Searcher と同じく，イベントを返す前にスタート／ゴールを確かめる
+        if not self.start_position or not self.goal_position:
+            raise ValueError("スタート地点またはゴール地点が見つかりません")
+        yield (GENERATE, self.start_position)
+        for expanded, children, parents in self._search_levels(debug):
+            j = 0
+            children = children.tolist()
+            parents = parents.tolist()
+            for u in expanded.tolist():
+                yield (EXPAND, self.grid.position(u))
+                # 子はキュー順に並んでいるので，親ごとにひと続きになっている
+                while j < len(children) and parents[j] == u:
+                    yield (GENERATE, self.grid.position(children[j]))
+                    j += 1
+        yield (FINISH, self.goal_flag)
+
+    def _expand(self, frontier, passable, visited):
+        # キュー順に「ノード × 探索方向」の順で候補を並べ，最初に現れたものだけ残す
+        candidates = (frontier[:, None] + self.offsets[None, :]).ravel()
+        parents = np.repeat(frontier, len(self.offsets))
+        mask = passable[candidates] & ~visited[candidates]
+        candidates = candidates[mask]
+        parents = parents[mask]
+        _, first = np.unique(candidates, return_index=True)
+        first.sort()
+        return candidates[first], parents[first]
+
+    def _search_levels(self, debug):
+        # 1 階層ごとに（展開したノード, 新しく見つかったノード, その親）を返す
+        if not self.start_position or not self.goal_position:
+            raise ValueError("スタート地点またはゴール地点が見つかりません")
+
+        # GridMap のバイト列をコピーせずに参照する（タイル順の地図ファイルは行優先に並べ直して読む）
+        try:
+            cells = np.frombuffer(self.grid.cells, dtype=np.uint8)
+        except TypeError:
+            cells = np.frombuffer(self.grid.cells[:], dtype=np.uint8)
+        passable = (cells & PASSABLE).astype(bool)
+        visited = np.zeros(len(self.grid), dtype=bool)
+        parent = np.full(len(self.grid), -1, dtype=np.int32)
+
+        goal_cell = self.grid.goal_cell
+        frontier = np.array([self.grid.start_cell], dtype=np.int64)
+        visited[self.grid.start_cell] = True
+        if self.record:
+            self.level_records.append(frontier)
+        depth = 0
+
+        while True:
+            # ゴールを含む階層では，キューでゴールより前にあるノードまで展開される
+            hit = np.flatnonzero(frontier == goal_cell)
+            if len(hit) > 0:
+                self.expanded_count += int(hit[0]) + 1
+                self.goal_flag = True
+                if debug:
+                    print(f"探索成功: 深さ {depth}")
+                yield (frontier[:hit[0] + 1],) + self._expand(frontier[:hit[0]], passable, visited)
+                break
+            self.expanded_count += len(frontier)
+
+            children, parents = self._expand(frontier, passable, visited)
+            yield frontier, children, parents
+            frontier = children
+            if len(frontier) == 0:
+                if debug:
+                    print("探索失敗")
+                break
+
+            visited[frontier] = True
+            parent[frontier] = parents
+            depth += 1
+            if self.record:
+                self.level_records.append(frontier)
+            if debug:
+                print(f"深さ {depth}: {len(frontier)} ノード")
+
+        if self.goal_flag:
+            cell = goal_cell
+            while cell != -1:
+                self.results_path.append(self.grid.position(int(cell)))
+                cell = parent[cell]
+            self.results_path.reverse()
+
+    def print_maze(self, maze=None, label="地図"):
+        if maze is None:
+            maze = self.get_result().to_symbols(self.start_symbol, self.goal_symbol, self.load_symbol,
+                                                self.wall_symbol, self.route_symbol)
+        print(label + ":")
+        for row in maze:
+            print([item for item in row])
+
+    def get_results_path(self):
+        return self.results_path
+
+    def get_result(self):
+        return SearchResult(self.grid, self.results_path, self.goal_flag, self.get_path_cost(), self.expanded_count)
+
+    def get_path_cost(self):
+        return (len(self.results_path) - 1) * self.cost if self.results_path else None
+
+    def get_level_records(self):
+        # 各階層のフロンティアを [y, x] の (n, 2) 配列で返す
+        records = []
+        for frontier in self.level_records:
+            y, x = np.divmod(frontier, self.grid.stride)
+            records.append(np.stack([y - 1, x - 1], axis=1))
+        return records
+
+    def get_expanded_count(self):
+        return self.expanded_count
+
+    def get_goal_flag(self):
+        return self.goal_flag
+
+    def get_start_position(self):
+        return self.start_position
+
+    def get_goal_position(self):
+        return self.goal_position
+
+if __name__ == "__main__":
+    maze_list = [
+        ["@",".",".",".","."],
+        [".",".",".",".","."],
+        [".",".",".","#","."],
+        [".",".","#","#","."],
+        [".",".",".",".","*"],
+    ]
+
+    searcher = Searcher(maze_list)
+    searcher.search(debug=True)
+    print(f"経路: {searcher.get_results_path()}")
+    print(f"展開数: {searcher.get_expanded_count()}")
+    for depth, frontier in enumerate(searcher.get_level_records()):
+        print(f"深さ {depth}: {frontier.tolist()}")
+    searcher.print_maze(label="経路")
@@ -1,14 +1,19 @@
 import sys
 import os
-from copy import deepcopy
+import time
+import math
+import hashlib
+import traceback
+from array import array
+from bisect import bisect_right
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout,
     QHBoxLayout, QRadioButton, QPushButton, QLineEdit, QLabel,
-    QSlider, QMessageBox, QComboBox
+    QSlider, QMessageBox, QComboBox, QAbstractScrollArea, QFrame, QFileDialog
 )
-from PySide6.QtGui import QPainter, QColor, QMouseEvent
-from PySide6.QtCore import Qt, QRect, QPoint, QTimer, QEventLoop
+from PySide6.QtGui import QPainter, QColor, QMouseEvent, QImage
+from PySide6.QtCore import Qt, QRect, QRectF, QLineF, QPoint, QTimer, QObject, QThread, Signal, Slot
 
 
 # Searchモジュールのインポート
@@ -16,14 +21,27 @@ from Modules import a_star_module as a_star
 from Modules import bfs_module as bfs
 from Modules import dfs_module as dfs
 from Modules import iddfs_module as iddfs
+from Modules import ida_star_module as ida_star
+from Modules import jps_module as jps
+from Modules import bidirectional_bfs_module as bidirectional_bfs
+from Modules import bidirectional_a_star_module as bidirectional_a_star
+from Modules import lpa_star_module as lpa_star
+from Modules.grid_map import GridMap, WALL, ROAD, START, GOAL
+from Modules import map_io
+from Modules.result_cache import ResultCache, SearchTrace, zobrist_key
+from Modules.search_events import GENERATE, EXPAND, GENERATE_BACKWARD, EXPAND_BACKWARD
 
 # --- 定数定義 ---
 DEFAULT_GRID_SIZE = 10
 MIN_GRID_SIZE = 10
-MAX_GRID_SIZE = 30
-CELL_SIZE = 40
+MAX_GRID_SIZE = 4000
+CELL_SIZE = 40  # 最初に表示するときの 1 セルの大きさ（グリッドが大きいときは全体が入るように縮める）
+MAX_CELL_SIZE = 80  # 拡大の上限
+VIEW_SIZE = 800  # グリッドの表示領域の最大の幅・高さ
+GRID_LINE_MIN_CELL_SIZE = 4  # 1 セルがこれより小さく表示されるときは枠線を描かない
+ZOOM_STEP = 1.25  # ホイール 1 段あたりの拡大率
 MARGIN_WIDTH = 40
-MARGIN_HEIGHT = 200
+MARGIN_HEIGHT = 240
 SLIDER_MIN = 0
 SLIDER_MAX = 100
 SLIDER_DEFAULT = 50
@@ -34,87 +52,534 @@ GOAL_COLOR = "blue"  # 青 (ゴール)
 WALL_COLOR = "darkgray"  # 黒 (障害物)
 L1_COLOR = "#98e2fb"  # ライトブルー (L1リスト)
 L2_COLOR = "#98fb98"  # ライトグリーン (L2リスト)
+L1_BACK_COLOR = "#fbd598"  # ライトオレンジ (ゴール側のL1リスト)
+L2_BACK_COLOR = "#f0b0e8"  # ライトピンク (ゴール側のL2リスト)
 RESULT_COLOR = "yellow"  # リセット時の色
+# 探索の表示で空白のセルに重ねる種類（0〜3 は地図のセルの種類 WALL, ROAD, START, GOAL）
+L1_CELL = 4
+L2_CELL = 5
+L1_BACK_CELL = 6
+L2_BACK_CELL = 7
+RESULT_CELL = 8
+PALETTE = (WALL_COLOR, DEFAULT_COLOR, START_COLOR, GOAL_COLOR,
+           L1_COLOR, L2_COLOR, L1_BACK_COLOR, L2_BACK_COLOR, RESULT_COLOR)  # 種類 -> 表示の色
+CELL_KINDS = {ROAD: 0, START: 1, GOAL: 2, WALL: 3}  # グリッドのハッシュ値で区別するセルの種類（空白は 0）
+# 読み込んだ地図のスタート／ゴールをいったん道にする変換表（スタート／ゴールは 1 つずつ置き直す）
+ENDPOINTS_TO_ROAD = bytes(ROAD if code in (START, GOAL) else code for code in range(256))
+MAP_FILE_FILTER = "地図 (*.map *.txt);;すべてのファイル (*)"  # .map は MovingAI の地図，それ以外は記号のテキスト
+RESULT_CACHE_BYTES = 64 * 1024 * 1024  # 探索結果キャッシュの上限
+SEARCH_CHUNK_EVENTS = 512  # 探索スレッドがまとめて送るイベントの数
+SEARCH_CHUNK_SECONDS = 0.05  # イベントが少なくてもこの間隔で送る
+PLAYBACK_FRAME_MS = 30  # 再生の 1 フレームの間隔（1 フレームで手を進めるのもこの時間まで）
+PLAYBACK_MAX_SECONDS = 20  # 記録がどれだけ大きくても，再生はおよそこの時間（実時間）で終わる
+PLAYBACK_SPEED_MIN = 1  # 再生速度は 2 ** 値 セル/秒
+PLAYBACK_SPEED_MAX = 10
+PLAYBACK_SPEED_DEFAULT = 4
+PLAYBACK_BATCH = 4096  # 1 フレームの中で，残り時間を確かめるまでに進める手の数
+DRAW_CELL_LIMIT = 64  # 描き直すセルがこれより多ければ，画像にまとめて書いてビュー全体を 1 回描き直す
+
+# アルゴリズム名 -> Searcher のモジュール（LPA* は前回の探索を引き継ぐので別に扱う）
+SEARCH_MODULES = {
+    "DFS": dfs,
+    "BFS": bfs,
+    "IDDFS": iddfs,
+    "A*": a_star,
+    "IDA*": ida_star,
+    "JPS": jps,
+    "双方向BFS": bidirectional_bfs,
+    "双方向A*": bidirectional_a_star,
+}
+
+
+class SearchWorker(QObject):
+    # 探索スレッドで search_iter() を回し，イベントをまとめて GUI スレッドへ送る
+    chunk_ready = Signal(object, int, int)  # イベントのリスト, 展開数, オープンリストの大きさ（不明なら -1）
+    finished = Signal(object, bool)  # 経路, ゴールに到達したか
+    cancelled = Signal()
+    failed = Signal(str)
+
+    def __init__(self, searcher):
+        super().__init__()
+        self.searcher = searcher
+        self.cancel_requested = False  # GUI スレッドから立てる
+
+    @Slot()
+    def run(self):
+        batch = []
+        expanded = 0
+        generated = 0
+        last_emit = time.perf_counter()
+        try:
+            for event in self.searcher.search_iter():
+                if self.cancel_requested:
+                    self.cancelled.emit()
+                    return
+                batch.append(event)
+                kind = event[0]
+                if kind in (EXPAND, EXPAND_BACKWARD):
+                    expanded += 1
+                elif kind in (GENERATE, GENERATE_BACKWARD):
+                    generated += 1
+                now = time.perf_counter()
+                if len(batch) >= SEARCH_CHUNK_EVENTS or now - last_emit >= SEARCH_CHUNK_SECONDS:
+                    # IDDFS / IDA* はオープンリストを持たない
+                    frontier = max(generated - expanded, 0) if generated else -1
+                    self.chunk_ready.emit(batch, expanded, frontier)
+                    batch = []
+                    last_emit = now
+            frontier = max(generated - expanded, 0) if generated else -1
+            result = self.searcher.get_result()
+        except ValueError as e:
+            self.failed.emit(str(e))
+            return
+        except Exception as e:
+            # 想定外の例外（MemoryError，壊れた地図など）でも failed を送り，GUI の操作を戻させる
+            traceback.print_exc()
+            self.failed.emit(f"探索中にエラーが発生しました（{type(e).__name__}: {e}）")
+            return
+        self.chunk_ready.emit(batch, expanded, frontier)
+        self.finished.emit([list(p) for p in result.path], result.goal_flag)
+
+
+class PlaybackController(QObject):
+    """1 つの QTimer で探索の記録を再生する．
+
+    記録の 1 セルを 1 手とし，手の列は作らずに SearchTrace の記録を直接たどる．
+    ふつうの探索は，展開 k ごとに list_1_records[k] の各セルを L1 にしてから list_2[k] を L2 にする．
+    IDDFS / IDA* は，反復ごとに展開したセルを L2 にしたあと，実行前の表示に戻す 1 手が入る．
+    探索中でも，届いた分まで手を増やしながら再生する．
+    """
+    position_changed = Signal(int, int)  # 今の位置, 届いている手の数
+    finished = Signal()
+
+    def __init__(self, grid_widget, parent=None):
+        super().__init__(parent)
+        self.grid_widget = grid_widget
+        self.timer = QTimer(self)
+        self.timer.setInterval(PLAYBACK_FRAME_MS)
+        self.timer.timeout.connect(self.advance_frame)
+        self.cells_per_second = 2 ** PLAYBACK_SPEED_DEFAULT
+        self.trace = None
+        self.ends = array("q")
+        self.total = 0
+        self.position = 0
+        self.playing = False
+
+    def start(self, trace, is_complete):
+        # is_complete() は記録がすべて届いたか（キャッシュから再生するときは常に真）
+        self.trace = trace
+        self.is_complete = is_complete
+        self.ends = array("q")  # 届いた記録（展開 / 反復）ごとの，その記録を再生し終えた位置
+        self.total = 0  # 届いている手の数
+        self.position = 0
+        self.carry = 0.0  # まだ進めていない手（1 手に満たない端数と，時間内に進めきれなかった分）
+        self.to_end = False
+        self.paused = False
+        self.playing = True
+        self.last_frame = time.perf_counter()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.playing = False
+
+    def set_speed(self, cells_per_second):
+        self.cells_per_second = cells_per_second
+
+    def toggle_pause(self):
+        self.paused = not self.paused
+        if self.paused:
+            self.timer.stop()
+        else:
+            self.last_frame = time.perf_counter()
+            self.timer.start()
+
+    def step(self):
+        # 一時停止して 1 手だけ進める
+        if not self.paused:
+            self.toggle_pause()
+        self.seek(self.position + 1)
+
+    def jump_to_end(self):
+        # 届いている手をすべて進め，あとから届く手もすぐに進める（1 フレームに進めるのは PLAYBACK_FRAME_MS まで）
+        self.to_end = True
+        if self.paused:
+            self.toggle_pause()
+
+    def seek(self, position):
+        self.pull_records()
+        position = max(0, min(position, self.total))
+        if position < self.position:
+            # 直前に表示を戻した位置（IDDFS / IDA* の反復の終わり．なければ最初）からやり直す
+            k = bisect_right(self.ends, position) if self.trace.depth_records is not None else 0
+            self.grid_widget.clear_overlay()
+            self.position = self.ends[k - 1] if k else 0
+        if position > self.position:
+            self.apply_range(self.position, position)
+            self.position = position
+        self.position_changed.emit(self.position, self.total)
+        self.check_finished()
+
+    def check_finished(self):
+        # 最後の手まで進み，記録もすべて届いていれば再生を終える（一時停止中に 1 手ずつ進めたときも）
+        if self.playing and self.position == self.total and self.is_complete():
+            self.stop()
+            self.finished.emit()
+
+    def pull_records(self):
+        # 届いた記録の区切りを足し，届いている手の数を数え直す
+        trace = self.trace
+        ends = self.ends
+        end = ends[-1] if ends else 0
+        if trace.depth_records is not None:
+            records = trace.depth_records
+            while len(ends) < len(records):
+                list_2 = records[len(ends)][1]
+                # 次の反復が始まっていれば（探索が終わっていれば），この反復の記録はもう増えない
+                if len(ends) + 1 < len(records) or self.is_complete():
+                    end += len(list_2) + 1  # 最後の 1 手で表示を戻す
+                    ends.append(end)
+                else:
+                    end += len(list_2)
+                    break
+        else:
+            # list_2 の k 番目が届いた時点で，L1 記録の k 番目はそろっている
+            while len(ends) < len(trace.list_2):
+                end += len(trace.list_1_records[len(ends)]) + 1
+                ends.append(end)
+        self.total = end
+
+    def apply_range(self, start, stop):
+        # start〜stop - 1 番目の手を overlay にまとめて書き，変わったセルを最後に描く
+        widget = self.grid_widget
+        trace = self.trace
+        cols = widget.cols
+        cells = widget.grid_map.cells
+        stride = widget.grid_map.stride
+        overlay = widget.overlay
+        sides = trace.list_2_sides
+        changed = []
+        k = bisect_right(self.ends, start)
+        head = self.ends[k - 1] if k else 0
+        while start < stop:
+            if trace.depth_records is not None:
+                # L2 のセルは塗り直しても変わらない
+                record = trace.depth_records[k][1]
+                kind = L2_CELL
+            else:
+                # 双方向探索ではゴール側から広げたノードを別の色で塗る．L1 記録の k 番目は k - 1 番目の展開で見つかったノード
+                record = trace.list_1_records[k]
+                kind = L1_BACK_CELL if sides and k > 0 and sides[k - 1] else L1_CELL
+            last = min(stop - head, len(record))
+            for y, x in record[start - head:last]:
+                i = y * cols + x
+                if not overlay[i] and cells[(y + 1) * stride + x + 1] == ROAD:
+                    overlay[i] = kind
+                    changed.append(i)
+            start = head + last
+            if start < stop:
+                # 記録の最後の 1 手
+                if trace.depth_records is not None:
+                    widget.clear_overlay()
+                    overlay = widget.overlay
+                    changed = []
+                else:
+                    y, x = trace.list_2[k]
+                    i = y * cols + x
+                    if overlay[i] in (L1_CELL, L1_BACK_CELL):
+                        overlay[i] = L2_BACK_CELL if sides and sides[k] else L2_CELL
+                        changed.append(i)
+                start += 1
+            head = self.ends[k] if k < len(self.ends) else head
+            k += 1
+        widget.draw_cells(changed)
+
+    def advance_frame(self):
+        self.pull_records()
+        now = time.perf_counter()
+        elapsed = now - self.last_frame
+        self.last_frame = now
+        remaining = self.total - self.position
+        if self.to_end:
+            count = remaining
+        else:
+            # 指定の速さで進めるが，全体が PLAYBACK_MAX_SECONDS に収まるように速める．
+            # 進める手数はフレームの数ではなく経った時間で決めるので，描くのに時間がかかっても遅れない
+            self.carry += max(self.cells_per_second, self.total / PLAYBACK_MAX_SECONDS) * elapsed
+            count = min(int(self.carry), remaining)
+            self.carry = 0.0 if count == remaining else self.carry - count  # 記録を待つ間はためない
+        # 1 フレームで手を進めるのは PLAYBACK_FRAME_MS まで（進めきれなかった分は次のフレームに回す）
+        target = self.position + count
+        deadline = now + PLAYBACK_FRAME_MS / 1000
+        while self.position < target and time.perf_counter() < deadline:
+            step = min(target, self.position + PLAYBACK_BATCH)
+            self.apply_range(self.position, step)
+            self.position = step
+        if not self.to_end:
+            self.carry += target - self.position
+        if count > 0:
+            self.position_changed.emit(self.position, self.total)
+        self.check_finished()
+
+
+class GridWidget(QAbstractScrollArea):
+    """グリッドを表示・編集するビュー．
+
+    地図は 1 セル 1 バイトの GridMap（grid_map）に持ち，Searcher にはそれを複製せずに渡す．
+    探索の途中経過（L1 / L2 / 経路）は地図とは別の overlay に重ね，地図は書き換えない．
+    表示の色はセルの種類から PALETTE で引き，1 セル 1 ピクセルの画像に持つ．画像は見えている範囲だけを表示倍率（cell_size）に合わせて
+    拡大・縮小して描く．1 セルが 1 ピクセル以下になるほど縮小したときは，画像をそのまま縮めて描く．
+    ホイールで拡大・縮小，右ボタンか中ボタンのドラッグとスクロールバーで移動する．
+    """
 
-class GridWidget(QWidget):
     def __init__(self, rows=DEFAULT_GRID_SIZE, cols=DEFAULT_GRID_SIZE, cell_size=CELL_SIZE):
         super().__init__()
-        self.cell_size = cell_size
+        self.setFrameShape(QFrame.NoFrame)
+        self.base_cell_size = cell_size
+        self.pan_origin = None  # 移動のドラッグを始めた位置とそのときのスクロール位置
+        self.pixels = [QColor(color).rgb() for color in PALETTE]  # セルの種類 -> 画像の画素値
+        # 画素値の 1 バイト目〜4 バイト目を種類から引く変換表（bytes.translate 用）
+        table = [value.to_bytes(4, sys.byteorder) for value in self.pixels]
+        table += [bytes(4)] * (256 - len(table))
+        self.channels = [bytes(pixel[i] for pixel in table) for i in range(4)]
         self.set_grid(rows, cols)
-        self.setMouseTracking(True)
+        self.viewport().setMouseTracking(True)
         self.is_dragging = False
-        self.color_mode = START_COLOR
+        self.edit_mode = START
+        self.editable = True  # 探索中は Searcher が地図を読むので編集させない
         self.last_orange_cell = None
         self.last_brightGreen_cell = None
 
     def set_grid(self, rows, cols):
         self.rows = rows
         self.cols = cols
-        self.grid = [[DEFAULT_COLOR for _ in range(cols)] for _ in range(rows)]
-        self.setFixedSize(self.cols * self.cell_size, self.rows * self.cell_size)
-        self.update()
+        self.grid_map = GridMap(rows, cols)
+        road = bytes([ROAD]) * cols
+        for y in range(rows):
+            head = self.grid_map.cell_id(y, 0)
+            self.grid_map.cells[head:head + cols] = road
+        self.overlay = bytearray(rows * cols)  # 重ねているセルの種類（0 は重ねていない）
+        self.edits = None  # 前回の LPA* 実行以降に塗り替えたセル（None はグリッド全体を作り直したとき）
+        self.grid_hash = 0  # Zobrist ハッシュ（set_cell で差分だけ更新する）
+        # 全体が VIEW_SIZE に収まる大きさで表示する（CELL_SIZE より大きくはしない）
+        self.cell_size = min(self.base_cell_size, VIEW_SIZE / max(rows, cols))
+        self.setFixedSize(round(cols * self.cell_size), round(rows * self.cell_size))
+        self.image = QImage(cols, rows, QImage.Format_RGB32)
+        self.image.fill(self.pixels[ROAD])
+        self.update_scrollbars()
+        self.viewport().update()
 
     def reset_grid(self):
         self.set_grid(self.rows, self.cols)
         self.last_orange_cell = None
         self.last_brightGreen_cell = None
 
-    def set_color_mode(self, mode: str):
-        self.color_mode = mode
+    def set_map(self, grid_map):
+        # 読み込んだ地図に置き換える（地図は複製して持つ．スタート／ゴールは grid_map の start_cell / goal_cell だけを置く）
+        self.set_grid(grid_map.rows, grid_map.cols)
+        cells = bytearray(grid_map.cells[:].translate(ENDPOINTS_TO_ROAD))
+        self.grid_map = GridMap(grid_map.rows, grid_map.cols, cells)
+        for cell, kind in ((grid_map.start_cell, START), (grid_map.goal_cell, GOAL)):
+            if cell != -1:
+                cells[cell] = kind
+        self.grid_map.start_cell = grid_map.start_cell
+        self.grid_map.goal_cell = grid_map.goal_cell
+        start = self.grid_map.get_start_position()
+        goal = self.grid_map.get_goal_position()
+        self.last_orange_cell = tuple(start) if start else None
+        self.last_brightGreen_cell = tuple(goal) if goal else None
+        # セルごとに Zobrist の値を足す代わりに地図全体から作る（このあとの編集はこれまでどおり差分で更新する）
+        self.grid_hash = int.from_bytes(hashlib.blake2b(cells, digest_size=8).digest(), "little")
+        self.clear_overlay()
+
+    def set_edit_mode(self, mode: int):
+        self.edit_mode = mode
+
+    def cell_kind(self, row, col):
+        # 表示しているセルの種類（重ねていれば重ねた種類）
+        return self.overlay[row * self.cols + col] or self.grid_map.cells[self.grid_map.cell_id(row, col)]
+
+    def paint_cell(self, row, col, kind):
+        # 地図はそのままで表示だけに種類を重ね，見えていればそのセルの範囲だけを描き直す
+        self.overlay[row * self.cols + col] = kind
+        self.draw_cell(row, col, kind)
+
+    def draw_cell(self, row, col, kind):
+        self.image.setPixel(col, row, self.pixels[kind])
+        z = self.cell_size
+        x = col * z - self.horizontalScrollBar().value()
+        y = row * z - self.verticalScrollBar().value()
+        # 枠線と端数の分だけ広めに取る
+        rect = QRect(math.floor(x) - 1, math.floor(y) - 1, math.ceil(z) + 3, math.ceil(z) + 3)
+        if rect.intersects(self.viewport().rect()):
+            self.viewport().update(rect)
+
+    def draw_cells(self, indices):
+        # overlay の indices（行 * cols + 列）のセルを描く．多ければ画像にまとめて書き，ビューを 1 回だけ描き直す
+        if len(indices) <= DRAW_CELL_LIMIT:
+            for i in indices:
+                row, col = divmod(i, self.cols)
+                self.draw_cell(row, col, self.overlay[i])
+            return
+        pixels = memoryview(self.image.bits()).cast("I")  # RGB32 の行に詰め物はない
+        overlay = self.overlay
+        values = self.pixels
+        for i in indices:
+            pixels[i] = values[overlay[i]]
+        self.viewport().update()
+
+    def clear_overlay(self):
+        # 重ねた表示をすべて消し，画像を地図から描き直す（アニメーション前の状態に戻すときなど）
+        self.overlay = bytearray(self.rows * self.cols)
+        cells = memoryview(self.grid_map.cells)
+        heads = range(self.grid_map.cell_id(0, 0), self.grid_map.cell_id(self.rows, 0), self.grid_map.stride)
+        kinds = b"".join(cells[head:head + self.cols] for head in heads)  # 外周の壁を除いた地図
+        # 画素の 4 バイトを 1 バイトずつ変換表で引いて並べる（RGB32 の行に詰め物はない）
+        pixels = bytearray(4 * len(kinds))
+        for i in range(4):
+            pixels[i::4] = kinds.translate(self.channels[i])
+        memoryview(self.image.bits())[:len(pixels)] = pixels
+        self.viewport().update()
+
+    def update_scrollbars(self):
+        z = self.cell_size
+        view = self.viewport()
+        full = self.maximumViewportSize()  # スクロールバーを出さないときのビューの大きさ
+        for bar, content, page, limit in ((self.horizontalScrollBar(), round(self.cols * z), view.width(), full.width()),
+                                          (self.verticalScrollBar(), round(self.rows * z), view.height(), full.height())):
+            bar.setRange(0, max(0, content - page) if content > limit else 0)
+            bar.setPageStep(page)
+            bar.setSingleStep(max(1, round(z)))
+
+    def zoom_at(self, pos, cell_size):
+        # pos（ビュー内の座標）の下にある点が動かないように表示倍率を変える
+        view = self.viewport()
+        fit = min(view.width() / self.cols, view.height() / self.rows)
+        cell_size = max(min(fit, MAX_CELL_SIZE), min(cell_size, MAX_CELL_SIZE))
+        h = self.horizontalScrollBar()
+        v = self.verticalScrollBar()
+        x = (pos.x() + h.value()) / self.cell_size
+        y = (pos.y() + v.value()) / self.cell_size
+        self.cell_size = cell_size
+        self.update_scrollbars()
+        h.setValue(round(x * cell_size - pos.x()))
+        v.setValue(round(y * cell_size - pos.y()))
+        view.update()
+
+    def cell_at(self, pos):
+        # ビュー内の座標にあるセルの (行, 列)．グリッドの外なら None
+        col = math.floor((pos.x() + self.horizontalScrollBar().value()) / self.cell_size)
+        row = math.floor((pos.y() + self.verticalScrollBar().value()) / self.cell_size)
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return row, col
+        return None
 
     def paintEvent(self, event):
-        painter = QPainter(self)
-        for row in range(self.rows):
-            for col in range(self.cols):
-                rect = QRect(col * self.cell_size, row * self.cell_size, self.cell_size, self.cell_size)
-                color = self.grid[row][col]
-                if color:
-                    painter.fillRect(rect, QColor(color))
-                painter.drawRect(rect)
+        painter = QPainter(self.viewport())
+        rect = event.rect()
+        painter.fillRect(rect, self.palette().window())
+        z = self.cell_size
+        left = self.horizontalScrollBar().value()
+        top = self.verticalScrollBar().value()
+
+        # 描き直す範囲に入るセルだけを画像から拡大・縮小して写す
+        c0 = max(0, math.floor((rect.left() + left) / z))
+        c1 = min(self.cols, math.ceil((rect.right() + 1 + left) / z))
+        r0 = max(0, math.floor((rect.top() + top) / z))
+        r1 = min(self.rows, math.ceil((rect.bottom() + 1 + top) / z))
+        if c0 >= c1 or r0 >= r1:
+            return
+        target = QRectF(c0 * z - left, r0 * z - top, (c1 - c0) * z, (r1 - r0) * z)
+        painter.drawImage(target, self.image, QRectF(c0, r0, c1 - c0, r1 - r0))
+
+        if z >= GRID_LINE_MIN_CELL_SIZE:
+            x0, x1 = c0 * z - left, c1 * z - left
+            y0, y1 = r0 * z - top, r1 * z - top
+            lines = [QLineF(c * z - left, y0, c * z - left, y1) for c in range(c0, c1 + 1)]
+            lines += [QLineF(x0, r * z - top, x1, r * z - top) for r in range(r0, r1 + 1)]
+            painter.drawLines(lines)
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scrollbars()
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.zoom_at(event.position(), self.cell_size * ZOOM_STEP ** steps)
 
     def mousePressEvent(self, event: QMouseEvent):
         if event.button() == Qt.LeftButton:
             self.is_dragging = True
             self.color_cell(event.position().toPoint(), drag=False)
+        elif event.button() in (Qt.RightButton, Qt.MiddleButton):
+            self.pan_origin = (event.position().toPoint(),
+                               self.horizontalScrollBar().value(), self.verticalScrollBar().value())
 
     def mouseMoveEvent(self, event: QMouseEvent):
-        if self.is_dragging and self.color_mode == WALL_COLOR:
+        if self.pan_origin is not None:
+            origin, h, v = self.pan_origin
+            delta = event.position().toPoint() - origin
+            self.horizontalScrollBar().setValue(h - delta.x())
+            self.verticalScrollBar().setValue(v - delta.y())
+        elif self.is_dragging and self.edit_mode == WALL:
             self.color_cell(event.position().toPoint(), drag=True)
 
     def mouseReleaseEvent(self, event: QMouseEvent):
         if event.button() == Qt.LeftButton:
             self.is_dragging = False
+        elif event.button() in (Qt.RightButton, Qt.MiddleButton):
+            self.pan_origin = None
+
+    def set_cell(self, row, col, kind):
+        # 地図のセルを書き換え，グリッドのハッシュ値と LPA* 用の変更記録を更新する
+        grid_map = self.grid_map
+        index = row * self.cols + col
+        cell = grid_map.cell_id(row, col)
+        old_kind = grid_map.cells[cell]
+        self.grid_hash ^= zobrist_key(index, CELL_KINDS[old_kind])
+        self.grid_hash ^= zobrist_key(index, CELL_KINDS[kind])
+        grid_map.cells[cell] = kind
+        if old_kind == START:
+            grid_map.start_cell = -1
+        elif old_kind == GOAL:
+            grid_map.goal_cell = -1
+        if kind == START:
+            grid_map.start_cell = cell
+        elif kind == GOAL:
+            grid_map.goal_cell = cell
+        self.overlay[index] = 0
+        self.draw_cell(row, col, kind)
+        if self.edits is not None:
+            self.edits.append((row, col))
 
     def color_cell(self, pos: QPoint, drag: bool):
-        col = pos.x() // self.cell_size
-        row = pos.y() // self.cell_size
-        if 0 <= row < self.rows and 0 <= col < self.cols:
-            current_color = self.grid[row][col]
+        cell = self.cell_at(pos)
+        if cell is not None and self.editable:
+            row, col = cell
+            current_kind = self.grid_map.cells[self.grid_map.cell_id(row, col)]
 
-            if drag and self.color_mode == WALL_COLOR:
-                if current_color is DEFAULT_COLOR:
-                    self.grid[row][col] = WALL_COLOR
-                    self.update()
+            if drag and self.edit_mode == WALL:
+                if current_kind == ROAD:
+                    self.set_cell(row, col, WALL)
 
             elif not drag:
-                if self.color_mode == START_COLOR:
+                if self.edit_mode == START:
                     if self.last_orange_cell:
                         r, c = self.last_orange_cell
-                        self.grid[r][c] = DEFAULT_COLOR
-                    self.grid[row][col] = START_COLOR
+                        self.set_cell(r, c, ROAD)
+                    self.set_cell(row, col, START)
                     self.last_orange_cell = (row, col)
-                    self.update()
 
-                elif self.color_mode == GOAL_COLOR:
+                elif self.edit_mode == GOAL:
                     if self.last_brightGreen_cell:
                         r, c = self.last_brightGreen_cell
-                        self.grid[r][c] = DEFAULT_COLOR
-                    self.grid[row][col] = GOAL_COLOR
+                        self.set_cell(r, c, ROAD)
+                    self.set_cell(row, col, GOAL)
                     self.last_brightGreen_cell = (row, col)
-                    self.update()
-
-    def get_grid_colors(self):
-        return [row[:] for row in self.grid]
 
 
 class MainWindow(QMainWindow):
@@ -136,18 +601,26 @@ class MainWindow(QMainWindow):
         size_layout.addWidget(self.resize_button)
         size_layout.addStretch()
 
+        # --- 地図の読み込みと保存 ---
+        self.open_button = QPushButton("開く")
+        self.open_button.clicked.connect(self.open_map_file)
+        self.save_button = QPushButton("保存")
+        self.save_button.clicked.connect(self.save_map_file)
+        size_layout.addWidget(self.open_button)
+        size_layout.addWidget(self.save_button)
+
         # --- ラジオボタン ---
         self.radio_orange = QRadioButton("赤 (スタート)")
         self.radio_brightGreen = QRadioButton("青 (ゴール)")
         self.radio_darkgray = QRadioButton("黒 (障害物)")
 
         self.radio_orange.setChecked(True)
-        self.radio_orange.toggled.connect(lambda: self.grid_widget.set_color_mode(START_COLOR))
-        self.radio_brightGreen.toggled.connect(lambda: self.grid_widget.set_color_mode(GOAL_COLOR))
-        self.radio_darkgray.toggled.connect(lambda: self.grid_widget.set_color_mode(WALL_COLOR))
+        self.radio_orange.toggled.connect(lambda: self.grid_widget.set_edit_mode(START))
+        self.radio_brightGreen.toggled.connect(lambda: self.grid_widget.set_edit_mode(GOAL))
+        self.radio_darkgray.toggled.connect(lambda: self.grid_widget.set_edit_mode(WALL))
 
         self.reset_button = QPushButton("リセット")
-        self.reset_button.clicked.connect(self.grid_widget.reset_grid)
+        self.reset_button.clicked.connect(self.reset_grid)
 
         radio_layout = QHBoxLayout()
         radio_layout.addWidget(self.radio_orange)
@@ -162,6 +635,11 @@ class MainWindow(QMainWindow):
         self.algorithm_combo.addItem("BFS")
         self.algorithm_combo.addItem("IDDFS") # ←注意
         self.algorithm_combo.addItem("A*")
+        self.algorithm_combo.addItem("IDA*")
+        self.algorithm_combo.addItem("JPS")
+        self.algorithm_combo.addItem("双方向BFS")
+        self.algorithm_combo.addItem("双方向A*")
+        self.algorithm_combo.addItem("LPA*")
         self.algorithm_combo.setCurrentText("DFS")
 
         # --- スライダーと実行ボタン ---
@@ -176,11 +654,47 @@ class MainWindow(QMainWindow):
 
         self.search_button = QPushButton("実行")
         self.search_button.clicked.connect(self.execute_search)
+        self.cancel_button = QPushButton("中止")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_search)
 
         bottom_layout = QHBoxLayout()
         bottom_layout.addWidget(self.slider_value_label)
         bottom_layout.addWidget(self.slider)
         bottom_layout.addWidget(self.search_button)
+        bottom_layout.addWidget(self.cancel_button)
+
+        # --- 再生の操作 ---
+        self.playback = PlaybackController(self.grid_widget, self)
+        self.playback.position_changed.connect(self.update_seek_slider)
+        self.playback.finished.connect(self.finish_search)
+
+        self.pause_button = QPushButton("一時停止")
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.step_button = QPushButton("1 手進む")
+        self.step_button.clicked.connect(self.playback.step)
+        self.end_button = QPushButton("最後まで")
+        self.end_button.clicked.connect(self.playback.jump_to_end)
+        self.seek_slider = QSlider(Qt.Horizontal)
+        self.seek_slider.setMaximum(0)
+        self.seek_slider.sliderMoved.connect(self.playback.seek)
+        self.speed_slider = QSlider(Qt.Horizontal)
+        self.speed_slider.setMinimum(PLAYBACK_SPEED_MIN)
+        self.speed_slider.setMaximum(PLAYBACK_SPEED_MAX)
+        self.speed_slider.setValue(PLAYBACK_SPEED_DEFAULT)
+        self.speed_slider.setFixedWidth(80)
+        self.speed_label = QLabel()
+        self.speed_slider.valueChanged.connect(self.update_speed)
+        self.update_speed(self.speed_slider.value())
+
+        playback_layout = QHBoxLayout()
+        playback_layout.addWidget(self.pause_button)
+        playback_layout.addWidget(self.step_button)
+        playback_layout.addWidget(self.end_button)
+        playback_layout.addWidget(self.seek_slider)
+        playback_layout.addWidget(self.speed_label)
+        playback_layout.addWidget(self.speed_slider)
+        self.set_playback_controls_enabled(False)
 
         # --- メインレイアウト ---
         layout = QVBoxLayout()
@@ -188,11 +702,14 @@ class MainWindow(QMainWindow):
         layout.addLayout(radio_layout)
         layout.addWidget(self.grid_widget)
         layout.addLayout(bottom_layout)
+        layout.addLayout(playback_layout)
 
         algo_layout = QHBoxLayout()
         algo_layout.addWidget(QLabel("アルゴリズム:"))
         algo_layout.addWidget(self.algorithm_combo)
         algo_layout.addStretch()
+        self.progress_label = QLabel("")
+        algo_layout.addWidget(self.progress_label)
         layout.addLayout(algo_layout)
 
         container = QWidget()
@@ -201,8 +718,22 @@ class MainWindow(QMainWindow):
 
         self.adjust_window_size()
 
+        # LPA* は探索状態を実行間で引き継ぐ
+        self.lpa_searcher = None
+        # グリッドのハッシュ値・アルゴリズム・探索コストが同じなら，探索せずに記録を再生する
+        self.result_cache = ResultCache(RESULT_CACHE_BYTES)
+
+        # 探索スレッドと，アニメーションが受け取り中の記録
+        self.search_thread = None
+        self.search_worker = None
+        self.live_trace = None
+        self.live_key = None
+        self.search_done = True
+        self.search_error = None
 
     def change_grid_size(self):
+        if not self.grid_widget.editable:
+            return  # 探索・再生中は地図の大きさを変えない
         try:
             size = int(self.size_input.text())
             if MIN_GRID_SIZE <= size <= MAX_GRID_SIZE:
@@ -215,107 +746,111 @@ class MainWindow(QMainWindow):
         except ValueError:
             print("数値を入力してください")
 
+    def open_map_file(self):
+        # MovingAI の .map か記号のテキストを読み込む（探索中は Searcher が地図を読んでいるので読み込まない）
+        if not self.grid_widget.editable:
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "地図を開く", "", MAP_FILE_FILTER)
+        if not path:
+            return
+        try:
+            grid_map = map_io.read_map(path)
+        except (OSError, ValueError) as error:
+            QMessageBox.warning(self, "地図を開く", str(error))
+            return
+        if max(grid_map.rows, grid_map.cols) > MAX_GRID_SIZE:
+            QMessageBox.warning(self, "地図を開く", f"表示できる地図は {MAX_GRID_SIZE}x{MAX_GRID_SIZE} までです")
+            return
+        self.grid_widget.set_map(grid_map)
+        self.adjust_window_size()
+
+    def save_map_file(self):
+        # 拡張子が .map なら MovingAI の地図（スタート／ゴールは書かない），それ以外は記号のテキストに書く
+        path, _ = QFileDialog.getSaveFileName(self, "地図を保存", "", MAP_FILE_FILTER)
+        if not path:
+            return
+        try:
+            map_io.write_map(path, self.grid_widget.grid_map)
+        except (OSError, ValueError) as error:
+            QMessageBox.warning(self, "地図を保存", str(error))
+
+    def reset_grid(self):
+        if self.grid_widget.editable:
+            self.grid_widget.reset_grid()
+
+    def set_editing_enabled(self, enabled):
+        # 探索スレッドと再生が地図を読んでいる間は，地図を変える操作をすべて止める
+        self.grid_widget.editable = enabled
+        for widget in (self.search_button, self.resize_button, self.open_button, self.reset_button):
+            widget.setEnabled(enabled)
+
     def adjust_window_size(self):
         width = self.grid_widget.width() + MARGIN_WIDTH
         height = self.grid_widget.height() + MARGIN_HEIGHT
         self.setFixedSize(width, height)
 
+    def create_searcher(self, selected_algo, grid_map, value):
+        # 地図は複製せずに渡す（探索中は編集させないので，Searcher が読んでいる間は変わらない）
+        if selected_algo == "LPA*":
+            searcher = self.lpa_searcher
+            edits = self.grid_widget.edits
+            if searcher is None or edits is None or searcher.cost != value:
+                searcher = lpa_star.Searcher(grid_map, passed_cost=value)
+                self.lpa_searcher = searcher
+            else:
+                # 前回の実行から塗り替えたセルだけを渡して引き直す
+                for y, x in edits:
+                    searcher.update_cell(y, x, grid_map.cells[grid_map.cell_id(y, x)])
+            self.grid_widget.edits = []
+            return searcher
+        return SEARCH_MODULES[selected_algo].Searcher(grid_map, passed_cost=value)
+
     def execute_search(self):
+        if not self.search_button.isEnabled():
+            return  # 再生中
         value = self.slider.value() / SLIDER_MAX
-        from copy import deepcopy
-        original_grid_state = deepcopy(self.grid_widget.grid)
-        grid_colors = self.grid_widget.get_grid_colors()
+        self.grid_widget.clear_overlay()
+        self.set_editing_enabled(False)
 
         selected_algo = self.algorithm_combo.currentText()
 
-        if selected_algo == "A*":
-            searcher = a_star.Searcher(
-                grid_colors,
-                passed_cost=value,
-                start_symbol=START_COLOR,
-                goal_symbol=GOAL_COLOR,
-                load_symbol=DEFAULT_COLOR,
-                wall_symbol=WALL_COLOR
-            )
-        elif selected_algo == "DFS":
-            searcher = dfs.Searcher(
-                grid_colors,
-                passed_cost=value,
-                start_symbol=START_COLOR,
-                goal_symbol=GOAL_COLOR,
-                load_symbol=DEFAULT_COLOR,
-                wall_symbol=WALL_COLOR
-            )
-        elif selected_algo == "BFS":
-            searcher = bfs.Searcher(
-                grid_colors,
-                passed_cost=value,
-                start_symbol=START_COLOR,
-                goal_symbol=GOAL_COLOR,
-                load_symbol=DEFAULT_COLOR,
-                wall_symbol=WALL_COLOR
-            )
-        elif selected_algo == "IDDFS":
-            searcher = iddfs.Searcher(
-                grid_colors,
-                passed_cost=value,
-                start_symbol=START_COLOR,
-                goal_symbol=GOAL_COLOR,
-                load_symbol=DEFAULT_COLOR,
-                wall_symbol=WALL_COLOR
-            )
-
-        searcher.search(debug=False)
-
-        if selected_algo == "IDDFS":
-            list_2s = searcher.get_depth_list_2_records().items()
-            for depth, list_2 in list_2s:
-                for i in list_2:
-                    y, x = i.getTarget()
-                    if self.grid_widget.grid[y][x] == L2_COLOR:
-                        self.grid_widget.grid[y][x] = DEFAULT_COLOR
-                        self.grid_widget.update()
-                        QTimer.singleShot(30, loop.quit)
-                        loop.exec()
-                    if self.grid_widget.grid[y][x] == DEFAULT_COLOR:
-                        self.grid_widget.grid[y][x] = L2_COLOR
-                    self.grid_widget.update()
-                    loop = QEventLoop()
-                    QTimer.singleShot(70, loop.quit)
-                    loop.exec()
-                self.grid_widget.grid = deepcopy(original_grid_state)
-                self.grid_widget.update()
+        self.cancel_button.setEnabled(True)
+        self.set_playback_controls_enabled(True)
+        self.search_error = None
+
+        key = (self.grid_widget.rows, self.grid_widget.cols, self.grid_widget.grid_hash, selected_algo, value)
+        trace = self.result_cache.get(key)
+        if trace is None:
+            # 探索は別スレッドで進め，届いた分から再生する
+            trace = SearchTrace()
+            self.start_search_worker(self.create_searcher(selected_algo, self.grid_widget.grid_map, value), trace, key)
         else:
-            list_2 = searcher.get_list_2()    
-            list_1_records = searcher.get_list_1_records()        
-            for elem_L1, elem_L2 in zip(list_1_records, list_2):
-                for i in elem_L1:
-                    y2, x2 = i
-                    if self.grid_widget.grid[y2][x2] == DEFAULT_COLOR:
-                        self.grid_widget.grid[y2][x2] = L1_COLOR
-                        self.grid_widget.update()
-                        loop = QEventLoop()
-                        QTimer.singleShot(50, loop.quit)
-                        loop.exec()
-                y1, x1 = elem_L2.getTarget()
-                if self.grid_widget.grid[y1][x1] == (L1_COLOR):
-                    self.grid_widget.grid[y1][x1] = L2_COLOR
-                    self.grid_widget.update()
-                    loop = QEventLoop()
-                    QTimer.singleShot(70, loop.quit)
-                    loop.exec()
+            self.search_done = True
+            self.progress_label.setText("キャッシュから再生")
+
+        self.playback.start(trace, lambda: self.search_done)
+
+    def finish_search(self):
+        # 再生が最後まで進んだら経路を描いて結果を出す
+        trace = self.playback.trace
+        self.cancel_button.setEnabled(False)
+        self.set_playback_controls_enabled(False)
+        self.set_editing_enabled(True)
+        if self.search_error is not None:
+            self.grid_widget.clear_overlay()
+            QMessageBox.warning(self, "探索結果", self.search_error)
+            return
 
         # 経路描画
-        for i in searcher.get_results_path():
+        for i in trace.results_path:
             y, x = i
-            if self.grid_widget.grid[y][x] in (DEFAULT_COLOR, L2_COLOR):
-                self.grid_widget.grid[y][x] = RESULT_COLOR
-        self.grid_widget.update()
+            if self.grid_widget.cell_kind(y, x) in (ROAD, L1_CELL, L2_CELL, L1_BACK_CELL, L2_BACK_CELL):
+                self.grid_widget.paint_cell(y, x, RESULT_CELL)
 
         # ポップアップ表示
         msg_box = QMessageBox(self)
         msg_box.setWindowTitle("探索結果")
-        if searcher.get_goal_flag():
+        if trace.goal_flag:
             msg_box.setText("探索に成功しました．")
         else:
             msg_box.setText("探索に失敗しました．")
@@ -328,8 +863,130 @@ class MainWindow(QMainWindow):
         if clicked == reset_button:
             self.grid_widget.reset_grid()
         elif clicked == retry_button:
-            self.grid_widget.grid = deepcopy(original_grid_state)
-            self.grid_widget.update()
+            self.grid_widget.clear_overlay()
+
+    def set_playback_controls_enabled(self, enabled):
+        for widget in (self.pause_button, self.step_button, self.end_button, self.seek_slider):
+            widget.setEnabled(enabled)
+        self.pause_button.setText("一時停止")
+
+    def toggle_pause(self):
+        self.playback.toggle_pause()
+        self.pause_button.setText("再開" if self.playback.paused else "一時停止")
+
+    def update_seek_slider(self, position, total):
+        self.pause_button.setText("再開" if self.playback.paused else "一時停止")
+        self.seek_slider.setMaximum(total)
+        if not self.seek_slider.isSliderDown():
+            self.seek_slider.setValue(position)
+
+    def update_speed(self, value):
+        cells_per_second = 2 ** value
+        self.playback.set_speed(cells_per_second)
+        self.speed_label.setText(f"再生速度: {cells_per_second} セル/秒")
+
+    def start_search_worker(self, searcher, trace, key):
+        self.live_trace = trace
+        self.live_key = key
+        self.search_done = False
+        self.progress_label.setText("探索中")
+        self.search_thread = QThread(self)
+        self.search_worker = SearchWorker(searcher)
+        self.search_worker.moveToThread(self.search_thread)
+        self.search_thread.started.connect(self.search_worker.run)
+        # 知らせは今の search_worker からのものだけを受け取る（各スロットで sender() を確かめる）
+        self.search_worker.chunk_ready.connect(self.on_search_chunk)
+        self.search_worker.finished.connect(self.on_search_finished)
+        self.search_worker.cancelled.connect(self.on_search_cancelled)
+        self.search_worker.failed.connect(self.on_search_failed)
+        self.search_thread.start()
+
+    def stop_search_worker(self):
+        self.search_thread.quit()
+        self.search_thread.wait()
+        self.search_worker.deleteLater()
+        self.search_thread.deleteLater()
+        self.search_thread = None
+        self.search_worker = None
+        self.live_trace = None
+        self.search_done = True
+
+    def is_current_worker(self):
+        return self.search_worker is not None and self.sender() is self.search_worker
+
+    def release_search_worker(self):
+        # 中止を頼んだあとにスレッドが止まったら，ここで初めて地図を触れるようにする
+        cancelled = self.search_worker.cancel_requested
+        self.stop_search_worker()
+        if cancelled and not self.playback.playing:
+            self.set_editing_enabled(True)
+        elif not cancelled and self.playback.playing:
+            # 一時停止中に届いた分の最後まで進めていれば，タイマーを待たずに終える
+            self.playback.pull_records()
+            self.playback.check_finished()
+
+    @Slot(object, int, int)
+    def on_search_chunk(self, events, expanded, frontier):
+        if not self.is_current_worker():
+            return
+        self.live_trace.add_events(events)
+        if self.search_worker.cancel_requested:
+            return  # 「中止しています」の表示を残す
+        text = f"展開: {expanded:,} ノード"
+        if frontier >= 0:
+            text += f"  オープンリスト: {frontier:,}"
+        self.progress_label.setText(text)
+
+    @Slot(object, bool)
+    def on_search_finished(self, results_path, goal_flag):
+        if not self.is_current_worker():
+            return
+        trace = self.live_trace
+        trace.results_path = results_path
+        trace.goal_flag = goal_flag
+        if self.search_worker.cancel_requested:
+            self.progress_label.setText("探索を中止しました")
+        else:
+            self.result_cache.put(self.live_key, trace)
+        self.release_search_worker()
+
+    @Slot()
+    def on_search_cancelled(self):
+        if not self.is_current_worker():
+            return
+        self.progress_label.setText("探索を中止しました")
+        self.release_search_worker()
+
+    @Slot(str)
+    def on_search_failed(self, message):
+        if not self.is_current_worker():
+            return
+        self.search_error = message
+        self.progress_label.setText("")
+        self.release_search_worker()
+
+    def cancel_search(self):
+        # 再生を打ち切って実行前の表示に戻す．探索スレッドには中止を頼み，止まるまで実行と編集はさせない
+        if self.playback.playing:
+            self.playback.stop()
+            self.grid_widget.clear_overlay()
+            self.cancel_button.setEnabled(False)
+            self.set_playback_controls_enabled(False)
+        if self.search_worker is None:
+            self.set_editing_enabled(True)
+        elif not self.search_worker.cancel_requested:
+            self.search_worker.cancel_requested = True
+            self.progress_label.setText("探索を中止しています")
+            if self.search_worker.searcher is self.lpa_searcher:
+                # 途中で止めた探索状態は引き継がない
+                self.lpa_searcher = None
+
+    def closeEvent(self, event):
+        self.cancel_search()
+        if self.search_thread is not None:
+            self.search_thread.quit()
+            self.search_thread.wait()
+        super().closeEvent(event)
 
     def update_slider_label(self, value):
         self.slider_value_label.setText(f"探索コスト: {value / SLIDER_MAX:.2f}")
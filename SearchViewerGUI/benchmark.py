@@ -0,0 +1,161 @@
+import sys
+import time
+import tracemalloc
+
+from Modules import bfs_module as bfs
+from Modules import a_star_module as a_star
+from Modules import wavefront_bfs_module as wavefront_bfs
+from Modules import lpa_star_module as lpa_star
+from Modules import distance_field_module as distance_field
+from Modules import map_io
+
+# --- 定数定義 ---
+DEFAULT_SIZES = [100, 200, 500, 1000, 2000]
+
+
+def start_measure():
+    # 地図を作り終えたところから測る（--memory のときはメモリの最大値もここから数える）
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    return time.perf_counter()
+
+
+def open_grid(size):
+    # 障害物なしの地図（左上スタート，右下ゴール）
+    maze_list = [["."] * size for _ in range(size)]
+    maze_list[0][0] = "@"
+    maze_list[size - 1][size - 1] = "*"
+    return maze_list
+
+
+def bench_bfs(size, record=True):
+    maze_list = open_grid(size)
+    start_time = start_measure()
+    searcher = bfs.Searcher(maze_list, record=record)
+    searcher.search()
+    elapsed = time.perf_counter() - start_time
+    return searcher.get_expanded_count(), elapsed
+
+
+def bench_a_star(size, record=True):
+    maze_list = open_grid(size)
+    start_time = start_measure()
+    searcher = a_star.Searcher(maze_list, record=record)
+    searcher.search()
+    elapsed = time.perf_counter() - start_time
+    return searcher.get_expanded_count(), elapsed
+
+
+def bench_wavefront_bfs(size, record=True):
+    maze_list = open_grid(size)
+    start_time = start_measure()
+    searcher = wavefront_bfs.Searcher(maze_list, record=record)
+    searcher.search()
+    elapsed = time.perf_counter() - start_time
+    return searcher.get_expanded_count(), elapsed
+
+
+def bench_lpa_star_replan(size, record=True):
+    # 最初の探索のあと，経路の中ほどに壁を 1 つ置いて引き直す時間だけを測る（展開数も引き直しの分だけ）
+    maze_list = open_grid(size)
+    searcher = lpa_star.Searcher(maze_list, record=record)
+    searcher.search()
+    y, x = searcher.get_results_path()[size]
+    start_time = start_measure()
+    searcher.update_cell(y, x, "#")
+    searcher.search()
+    elapsed = time.perf_counter() - start_time
+    return searcher.get_expanded_count(), elapsed
+
+
+def bench_distance_field(size, record=True):
+    # 距離場を作ったあと，別のスタートから同じゴールへの 2 回目の問い合わせだけを測る．
+    # 表をたどるだけで展開はしないので，数は経路長（たどったセルの数）．地図は grid_key で示し，指紋は計算しない
+    maze_list = open_grid(size)
+    distance_field.Searcher(maze_list, grid_key=("open", size)).search()
+    maze_list = open_grid(size)
+    maze_list[0][0] = "."
+    maze_list[0][size - 1] = "@"
+    start_time = start_measure()
+    searcher = distance_field.Searcher(maze_list, grid_key=("open", size), record=record)
+    searcher.search()
+    elapsed = time.perf_counter() - start_time
+    return len(searcher.get_results_path()), elapsed
+
+
+BENCHMARKS = {
+    "bfs": bench_bfs,
+    "astar": bench_a_star,
+    "wavefront": bench_wavefront_bfs,
+    "lpa": bench_lpa_star_replan,
+    "field": bench_distance_field,
+}
+
+# ベンチマークが返す数の表し方：(名前, 単位, 1 秒あたりの単位．None なら出さない)
+RESULT_LABELS = {
+    "lpa": ("引き直しで展開", "ノード", "展開/秒"),
+    "field": ("経路長", "セル", None),
+}
+DEFAULT_RESULT_LABEL = ("展開", "ノード", "展開/秒")
+
+
+# シナリオを流せる Searcher（--scen のとき）
+SCENARIO_MODULES = {
+    "bfs": bfs,
+    "astar": a_star,
+    "wavefront": wavefront_bfs,
+    "field": distance_field,
+}
+
+
+def bench_scenarios(name, path, record=True):
+    # .scen の全シナリオを順に探索する（地図はシナリオの map 列から探して 1 度だけ読む）
+    grids = {}
+    count = reached = expanded = 0
+    start_time = start_measure()
+    for scenario in map_io.read_scenarios(path):
+        grid = grids.get(scenario.map_name)
+        if grid is None:
+            grid = grids[scenario.map_name] = map_io.read_map(map_io.find_scenario_map(path, scenario.map_name))
+        # 距離場は地図の名前をキーにして，シナリオごとに地図全体の指紋を計算しない
+        options = {"grid_key": scenario.map_name} if name == "field" else {}
+        for _, result in map_io.run_scenarios(SCENARIO_MODULES[name], grid, [scenario], record=record, **options):
+            count += 1
+            reached += result.goal_flag
+            expanded += result.expanded_count or 0
+    elapsed = time.perf_counter() - start_time
+    return count, reached, expanded, elapsed
+
+
+if __name__ == "__main__":
+    # 使い方: python benchmark.py [bfs|astar|wavefront|lpa|field] [--no-record] [--memory] [サイズ ...]
+    #   --no-record: 表示用の記録を作らずに探索する（record=False）
+    #   --memory: 探索中に確保したメモリの最大値も表示する（tracemalloc を使うので時間は遅くなる）
+    #        python benchmark.py [bfs|astar|wavefront|field] --scen シナリオ.scen [--no-record]
+    #   --scen: MovingAI の .scen のシナリオを順に探索する（地図の読み込みも時間に含む）
+    args = sys.argv[1:]
+    name = args.pop(0) if args and args[0] in BENCHMARKS else "bfs"
+    record = "--no-record" not in args
+    memory = "--memory" in args
+    if "--scen" in args:
+        if name not in SCENARIO_MODULES:
+            sys.exit(f"--scen で使えるのは {', '.join(SCENARIO_MODULES)} です")
+        path = args[args.index("--scen") + 1]
+        count, reached, expanded, elapsed = bench_scenarios(name, path, record)
+        print(f"{name} {path}: {count} 件（到達 {reached} 件）, 展開 {expanded} ノード, "
+              f"{elapsed:.2f} 秒, {count / elapsed:,.1f} 件/秒")
+        sys.exit()
+    sizes = [int(arg) for arg in args if not arg.startswith("--")] or DEFAULT_SIZES
+    for size in sizes:
+        if memory:
+            tracemalloc.start()
+        count, elapsed = BENCHMARKS[name](size, record)
+        label, unit, rate = RESULT_LABELS.get(name, DEFAULT_RESULT_LABEL)
+        line = f"{name} {size}x{size}: {label} {count} {unit}, {elapsed:.2f} 秒"
+        if rate is not None:
+            line += f", {count / elapsed:,.0f} {rate}"
+        if memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            line += f", 最大 {peak / 1024 / 1024:.1f} MB"
+        print(line)
@@ -1,4 +1,3 @@
-import copy
 try:
     from .structure import Structure as St  # 相対インポート
 except ImportError:
@@ -19,8 +18,7 @@ class Searcher:
         self.wall_symbol = wall_symbol
         self.route_symbol = route_symbol
 
-        # 構造と位置関係
-        self.copy_list = copy.deepcopy(maze_list)
+        # 構造と位置関係（maze_list は読むだけで書き換えない）
         # ★ maze_sizeを活用することで，IndexOutOfRangeを防ぐことができます ★
         self.maze_size = [len(maze_list), len(maze_list[0])]
         # ★ 探索順番（右，下，左，上） ★
@@ -98,7 +96,6 @@ class Searcher:
         if self.goal_flag:
             tmp = goal_node
             while True:
-                self.maze_list[tmp.getTarget()[0]][tmp.getTarget()[1]] = self.route_symbol
                 self.results_path.append(tmp.getTarget())
                 if tmp.getTarget() == self.start_position:
                     break
@@ -110,7 +107,7 @@ class Searcher:
 
     def _print_maze(self, maze=None, label="地図"):
         if maze is None:
-            maze = self.maze_list
+            maze = self.get_route_maze()
         print(label + ":")
         for row in maze:
             print([item for item in row])
@@ -118,6 +115,13 @@ class Searcher:
     # 他プログラムから呼び出す際に使用
     def get_results_path(self):
         return self.results_path
+
+    def get_route_maze(self):
+        # maze_list を行ごとに複製し，経路のセルを route_symbol にしたもの（表示用）
+        maze = [list(row) for row in self.maze_list]
+        for y, x in self.results_path:
+            maze[y][x] = self.route_symbol
+        return maze
     
     def get_list_1(self):
         return self.list_1